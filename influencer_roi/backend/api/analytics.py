@@ -0,0 +1,112 @@
+"""
+Multi-dimension pivot over tracking revenue and payouts
+
+Any breakdown is answered with at most two queries: one grouped aggregate
+over the daily tracking rollup and one over payouts, merged in memory on
+the requested dimensions.
+"""
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+from payouts.models import Payout
+from tracking.models import TrackingDailyRollup
+
+from .filters import FilterSpec
+
+# Dimension -> lookup (or month expression source) on each side; None means
+# the dimension does not exist on that side
+DIMENSIONS = {
+    'platform': ('influencer__platform', 'influencer__platform'),
+    'category': ('influencer__category', 'influencer__category'),
+    'gender': ('influencer__gender', 'influencer__gender'),
+    'brand': ('brand', None),
+    'campaign': ('campaign', None),
+    'month': ('date', 'payout_date'),
+}
+
+TRACKING_METRICS = ('revenue', 'orders')
+PAYOUT_METRICS = ('payout',)
+METRICS = TRACKING_METRICS + PAYOUT_METRICS + ('roas',)
+
+
+def parse_list(value, allowed, label):
+    """Split a comma separated parameter and check every item is allowed"""
+    items = [item.strip() for item in (value or '').split(',') if item.strip()]
+    unknown = [item for item in items if item not in allowed]
+    if unknown:
+        raise Exception(f"Invalid {label}: {unknown}. Must be any of: {list(allowed)}")
+    return list(dict.fromkeys(items))
+
+
+def grouped(queryset, dimensions, side, **aggregates):
+    """Return {dimension values: aggregates} for one side of the pivot"""
+    if not dimensions:
+        return {(): queryset.aggregate(**aggregates)}
+
+    columns = {}
+    for dimension in dimensions:
+        lookup = DIMENSIONS[dimension][side]
+        if dimension == 'month':
+            queryset = queryset.annotate(**{f'pivot_{dimension}': TruncMonth(lookup)})
+            columns[dimension] = f'pivot_{dimension}'
+        else:
+            columns[dimension] = lookup
+
+    rows = queryset.order_by().values(*columns.values()).annotate(**aggregates)
+    result = {}
+    for row in rows:
+        key = []
+        for dimension, column in columns.items():
+            value = row[column]
+            if dimension == 'month' and value is not None:
+                value = value.strftime('%Y-%m')
+            key.append(value)
+        result[tuple(key)] = {name: row[name] for name in aggregates}
+    return result
+
+
+def pivot(params):
+    """Break revenue, orders, payouts and ROAS down by the requested dimensions"""
+    dimensions = parse_list(params.get('dimensions'), DIMENSIONS, 'dimensions')
+    metrics = parse_list(params.get('metrics'), METRICS, 'metrics') or list(METRICS)
+
+    needs_payouts = 'payout' in metrics or 'roas' in metrics
+    needs_tracking = 'roas' in metrics or any(metric in TRACKING_METRICS for metric in metrics)
+    unsplit = [dimension for dimension in dimensions if DIMENSIONS[dimension][1] is None]
+    if needs_payouts and unsplit:
+        raise Exception(f"Payouts are not recorded per {' or '.join(unsplit)}, so payout and roas cannot be broken down by it")
+
+    # A brand filter cannot be applied to payouts, so it only narrows revenue
+    filters = FilterSpec.from_params(params)
+
+    tracking = {}
+    if needs_tracking:
+        queryset = filters.tracking(TrackingDailyRollup.objects.all())
+        tracking = grouped(queryset, dimensions, 0, revenue=Sum('revenue'), orders=Sum('orders'))
+
+    payouts = {}
+    if needs_payouts:
+        queryset = filters.payouts(Payout.objects.all())
+        payouts = grouped(queryset, dimensions, 1, payout=Sum('total_payout'))
+
+    results = []
+    for key in list(tracking) + [key for key in payouts if key not in tracking]:
+        revenue = (tracking.get(key) or {}).get('revenue') or 0
+        payout = (payouts.get(key) or {}).get('payout') or 0
+        values = {
+            'revenue': revenue,
+            'orders': (tracking.get(key) or {}).get('orders') or 0,
+            'payout': payout,
+            'roas': round(revenue / payout, 2) if payout > 0 else 0,
+        }
+        results.append({
+            **dict(zip(dimensions, key)),
+            **{metric: values[metric] for metric in metrics},
+        })
+
+    results.sort(key=lambda row: row[metrics[0]], reverse=True)
+    return {
+        'dimensions': dimensions,
+        'metrics': metrics,
+        'results': results,
+    }
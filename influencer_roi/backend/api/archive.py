@@ -0,0 +1,150 @@
+"""
+Multi-entity zip archive uploads
+
+An archive may contain any of influencers.*, posts.*, tracking.* and
+payouts.* in any supported format. Influencers are loaded and committed
+first; posts, tracking and payouts then load in parallel, all resolving
+names through one shared influencer index.
+"""
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, transaction
+
+from .ingest import LOADERS, InfluencerIndex, write_lock
+from .native import NATIVE_LOADERS
+from .readers import get_reader
+
+ARCHIVE = 'archive'
+
+
+def is_archive(filename):
+    return filename.lower().endswith('.zip')
+
+
+def find_members(archive):
+    """Map each model type to its member file, in dependency order"""
+    found = {}
+    for info in archive.infolist():
+        base_name = os.path.basename(info.filename)
+        if info.is_dir() or not base_name or info.filename.startswith('__MACOSX/'):
+            continue
+
+        model_type = base_name.split('.', 1)[0].lower()
+        if model_type not in LOADERS:
+            continue
+        if model_type in found:
+            raise Exception(f"Archive contains more than one {model_type} file")
+        if get_reader(base_name) is None:
+            raise Exception(f"Unsupported file format in archive: {info.filename}")
+        found[model_type] = info.filename
+
+    if not found:
+        raise Exception(f"Archive must contain at least one of: {[f'{name}.*' for name in LOADERS]}")
+
+    return {model_type: found[model_type] for model_type in LOADERS if model_type in found}
+
+
+class ArchiveLoader:
+    """
+    Loads every entity file of an archive within one import
+    """
+
+    def __init__(self, batch_size=None, commit_mode=None, upsert=False):
+        self.options = {'batch_size': batch_size, 'commit_mode': commit_mode, 'upsert': upsert}
+        self.commit_mode = commit_mode
+        self.members = {}
+        self.loaders = {}
+
+    @property
+    def total_records(self):
+        return sum(loader.total_records for loader in self.loaders.values())
+
+    @property
+    def created_count(self):
+        return sum(loader.created_count for loader in self.loaders.values())
+
+    @property
+    def errors(self):
+        return [
+            f"{self.members[model_type]}: {error}"
+            for model_type, loader in self.loaders.items()
+            for error in loader.errors
+        ]
+
+    def rows(self, archive, model_type):
+        name = self.members[model_type]
+        return get_reader(name)(archive.open(name))
+
+    def load_member(self, archive, model_type):
+        """Load one member file in its own chunked transactions on a worker thread"""
+        try:
+            self.loaders[model_type].run(self.rows(archive, model_type))
+        finally:
+            connection.close()
+
+    def run_file(self, file, filename=None):
+        """Load the archive and return the combined upload report"""
+        with zipfile.ZipFile(file) as archive:
+            self.members = find_members(archive)
+
+            index = InfluencerIndex()
+            loaders = {}
+            for model_type in self.members:
+                options = dict(self.options)
+                if model_type == 'influencers':
+                    options['upsert'] = False
+                loaders[model_type] = NATIVE_LOADERS[model_type](index, **options)
+            self.loaders = loaders
+
+            if self.commit_mode == 'all':
+                with write_lock(), transaction.atomic():
+                    for model_type in self.members:
+                        self.loaders[model_type].load(self.rows(archive, model_type))
+                    # Errors in any file undo the whole archive
+                    if self.errors:
+                        transaction.set_rollback(True)
+                        for loader in self.loaders.values():
+                            loader.discard()
+                return self.result()
+
+            if 'influencers' in self.members:
+                self.loaders['influencers'].run(self.rows(archive, 'influencers'))
+
+            dependents = [model_type for model_type in self.members if model_type != 'influencers']
+            if dependents:
+                with ThreadPoolExecutor(max_workers=len(dependents)) as pool:
+                    futures = [
+                        pool.submit(self.load_member, archive, model_type)
+                        for model_type in dependents
+                    ]
+                    for future in futures:
+                        future.result()
+
+        return self.result()
+
+    def result(self):
+        """Return the combined upload report with a breakdown per file"""
+        total_records = self.total_records
+        created_count = self.created_count
+        existing_count = total_records - created_count
+        message = f'Processed {total_records} records from {len(self.loaders)} files: {created_count} created, {existing_count} already existed'
+        rolled_back = any(loader.rolled_back for loader in self.loaders.values())
+        if rolled_back:
+            message = f'Rolled back {total_records} records from {len(self.loaders)} files: {len(self.errors)} had errors, nothing was written'
+        report = {
+            'message': message,
+            'created_count': created_count,
+            'existing_count': existing_count,
+            'total_records': total_records,
+            'commit_mode': self.commit_mode,
+            'errors': self.errors,
+            'files': {
+                model_type: {'file': self.members[model_type], **loader.result()}
+                for model_type, loader in self.loaders.items()
+            },
+        }
+        if rolled_back:
+            report['rolled_back'] = True
+        return report
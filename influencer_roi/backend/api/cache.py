@@ -0,0 +1,151 @@
+"""
+Versioned cache of analytics responses
+
+Responses are cached per endpoint, normalized filters and data version. Every
+write to influencers, posts, tracking data or payouts replaces the version of
+its table once its transaction commits, so entries computed from older data
+are never read again and simply expire. The versions live in the cache
+itself, so a file-based (or any shared) backend keeps all workers
+consistent; the local-memory backend is only correct for a single process.
+"""
+import hashlib
+import threading
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .filters import FilterSpec
+from .singleflight import SingleFlight, run_locked
+
+# Tables versioned separately, so a response can depend on only the ones it reads
+DATA_TABLES = ('influencers', 'posts', 'tracking', 'payouts')
+
+# Hits, misses and requests that shared another's computation, in this process
+_stats = {'hits': 0, 'misses': 0, 'coalesced': 0}
+_stats_lock = threading.Lock()
+
+# Analytics computations in flight in this process
+_flights = SingleFlight()
+
+
+def get_cache():
+    """Return the analytics cache, or None when ANALYTICS_CACHE is disabled"""
+    alias = getattr(settings, 'ANALYTICS_CACHE', 'analytics')
+    if not alias or alias not in settings.CACHES:
+        return None
+    return caches[alias]
+
+
+def version_key(table):
+    return f'analytics:version:{table}'
+
+
+def data_version(tables=DATA_TABLES):
+    """Return the combined version of `tables`, starting new ones the cache lost"""
+    cache = get_cache()
+    keys = [version_key(table) for table in tables]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            version = uuid.uuid4().hex
+            if not cache.add(key, version, timeout=None):
+                version = cache.get(key, version)
+            versions[key] = version
+    return '.'.join(versions[key] for key in keys)
+
+
+def bump_data_version(tables=DATA_TABLES):
+    cache = get_cache()
+    if cache is not None:
+        # Random tokens rather than counters, so concurrent bumps need no lock
+        cache.set_many({version_key(table): uuid.uuid4().hex for table in tables}, timeout=None)
+
+
+def data_changed(*tables):
+    """Invalidate cached responses reading `tables` (default: all) once the current transaction commits"""
+    tables = tables or DATA_TABLES
+    transaction.on_commit(lambda: bump_data_version(tables))
+
+
+def count(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def cache_stats():
+    """Report the backend, table versions and this process's hit, miss and coalesced counts"""
+    cache = get_cache()
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    return {
+        'enabled': cache is not None,
+        'backend': f'{type(cache).__module__}.{type(cache).__name__}' if cache is not None else None,
+        'versions': {table: data_version((table,)) for table in DATA_TABLES} if cache is not None else None,
+        **stats,
+        'hit_rate': round(stats['hits'] / lookups, 4) if lookups else 0,
+    }
+
+
+def cache_key(request, params, cache):
+    """Key a request by endpoint, normalized filters, extra params and data version"""
+    filters = FilterSpec.from_params(request.query_params)
+    extra = tuple((name, request.query_params.get(name, '').strip()) for name in params)
+    version = data_version() if cache is not None else None
+    raw = repr((request.path, filters.key, extra, version))
+    return 'analytics:' + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def cached_analytics(*params):
+    """
+    Cache the data of an analytics action's or view's successful responses;
+    `params` names query params besides the dashboard filters that change the result
+
+    Identical requests arriving while the response is computed wait for it
+    instead of computing it again (see api/singleflight.py).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            request = next(arg for arg in args if isinstance(arg, Request))
+            key = cache_key(request, params, cache)
+            if cache is not None:
+                data = cache.get(key)
+                if data is not None:
+                    count('hits')
+                    return Response(data)
+                count('misses')
+
+            # The response of the computation run by this request, if it ran one
+            responses = []
+
+            def compute():
+                response = view(*args, **kwargs)
+                responses.append(response)
+                if response.status_code != 200:
+                    return None
+                data = response.data
+                if not isinstance(data, (dict, list)):
+                    data = response.data = list(data)
+                if cache is not None:
+                    cache.set(key, data)
+                return data
+
+            timeout = getattr(settings, 'ANALYTICS_SINGLE_FLIGHT_TIMEOUT', 30)
+            if cache is not None and getattr(settings, 'ANALYTICS_SINGLE_FLIGHT_LOCK', False):
+                run = lambda: run_locked(cache, key, compute, timeout)
+            else:
+                run = compute
+            data, shared = _flights.run(key, run, timeout)
+            if shared or not responses:
+                count('coalesced')
+                return Response(data)
+            return responses[0]
+        return wrapper
+    return decorator
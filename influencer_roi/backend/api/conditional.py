@@ -0,0 +1,88 @@
+"""
+Conditional GET for the model viewsets
+
+Every GET response carries a strong ETag derived from the request's path and
+query params and the data versions of the tables the view reads (see
+api/cache.py). A request whose If-None-Match matches is answered with
+304 Not Modified before any query runs. Viewsets use ConditionalGetMixin,
+function views the conditional_get decorator.
+"""
+import hashlib
+from functools import wraps
+
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache import DATA_TABLES, data_version, get_cache
+
+
+class NotModified(Exception):
+    """The client's cached representation is still current"""
+
+
+def compute_etag(request, tables):
+    """Return the quoted ETag of a GET request against the current versions of `tables`"""
+    params = sorted((name, value) for name, values in request.query_params.lists() for value in values)
+    raw = repr((request.path, params, data_version(tables)))
+    return '"%s"' % hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def etag_matches(etag, header):
+    """Weak comparison of an ETag against an If-None-Match header, as RFC 9110 requires"""
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag in [tag[2:] if tag.startswith('W/') else tag for tag in etags]
+
+
+def set_etag(response, etag):
+    response['ETag'] = etag
+    # Clients may keep the body but must revalidate it before reuse
+    response['Cache-Control'] = 'no-cache'
+
+
+def conditional_get(tables=DATA_TABLES):
+    """Add ETags to a function view's GET responses, answering a matching If-None-Match with 304"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or get_cache() is None:
+                return view(request, *args, **kwargs)
+            etag = compute_etag(request, tables)
+            if etag_matches(etag, request.headers.get('If-None-Match')):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                set_etag(response, etag)
+            return response
+        return wrapper
+    return decorator
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETags to a viewset's GET responses and answers a matching
+    If-None-Match with 304; `data_tables` names the tables its responses read
+    """
+    data_tables = DATA_TABLES
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = None
+        if request.method in ('GET', 'HEAD') and get_cache() is not None:
+            self.etag = compute_etag(request, self.data_tables)
+            if etag_matches(self.etag, request.headers.get('If-None-Match')):
+                raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'etag', None) and response.status_code in (200, 304):
+            set_etag(response, self.etag)
+        return response
@@ -0,0 +1,252 @@
+"""
+One-shot dashboard snapshot
+
+Every panel of the dashboard is derived in memory from two grouped
+aggregates: the daily tracking rollup grouped by influencer, campaign and
+brand, and payouts grouped by influencer and basis. Each side is read at
+most once, and only when a requested panel needs it. Panels have the same
+shape as the analytics endpoint they are named after.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, Sum
+
+from payouts.models import Payout
+from payouts.serializers import PayoutSummarySerializer
+from tracking.models import TrackingDailyRollup
+from tracking.serializers import TrackingDataSummarySerializer
+
+from .analytics import parse_list
+from .filters import FilterSpec
+
+TRACKING_GROUP = ('influencer', 'influencer__name', 'influencer__platform', 'influencer__category', 'campaign', 'brand')
+PAYOUT_GROUP = ('influencer', 'influencer__name', 'influencer__platform', 'influencer__category', 'basis')
+
+
+def tracking_groups(filters):
+    return list(
+        filters.tracking(TrackingDailyRollup.objects.all()).order_by().values(*TRACKING_GROUP).annotate(
+            total_revenue=Sum('revenue'),
+            total_orders=Sum('orders'),
+            total_rows=Sum('row_count')
+        )
+    )
+
+
+def payout_groups(filters):
+    return list(
+        filters.payouts(Payout.objects.all()).order_by().values(*PAYOUT_GROUP).annotate(
+            total_payout=Sum('total_payout'),
+            total_orders=Sum('orders'),
+            total_rate=Sum('rate'),
+            payouts=Count('id')
+        )
+    )
+
+
+def total(groups, field):
+    return sum((group[field] for group in groups), 0)
+
+
+def regroup(groups, field, *sums):
+    """Sum the given fields of base groups per value of `field`, keeping first-seen order"""
+    result = {}
+    for group in groups:
+        totals = result.setdefault(group[field], dict.fromkeys(sums, 0))
+        for name in sums:
+            totals[name] += group[name]
+    return result
+
+
+def distinct(groups, field, key='influencer'):
+    """Count the distinct `key` values per value of `field`"""
+    seen = defaultdict(set)
+    for group in groups:
+        seen[group[field]].add(group[key])
+    return {value: len(keys) for value, keys in seen.items()}
+
+
+def roas(revenue, payout):
+    return round(revenue / payout, 2) if payout > 0 else 0
+
+
+class Snapshot:
+    """
+    The shared aggregates of one set of filters, read on first use
+    """
+
+    def __init__(self, filters):
+        self.filters = filters
+        self._tracking = None
+        self._payouts = None
+
+    @property
+    def tracking(self):
+        if self._tracking is None:
+            self._tracking = tracking_groups(self.filters)
+        return self._tracking
+
+    @property
+    def payouts(self):
+        if self._payouts is None:
+            self._payouts = payout_groups(self.filters)
+        return self._payouts
+
+    def totals(self, field):
+        """Revenue, orders and average order value per value of `field`, highest revenue first"""
+        rows = []
+        for value, totals in regroup(self.tracking, field, 'total_revenue', 'total_orders', 'total_rows').items():
+            rows.append({
+                field: value,
+                'total_revenue': totals['total_revenue'],
+                'total_orders': totals['total_orders'],
+                'avg_order_value': totals['total_revenue'] / totals['total_rows'] if totals['total_rows'] else 0,
+            })
+        return sorted(rows, key=lambda row: row['total_revenue'], reverse=True)
+
+    def payout_totals(self):
+        total_payouts = total(self.payouts, 'total_payout')
+        total_orders = total(self.payouts, 'total_orders')
+        total_influencers = len({group['influencer'] for group in self.payouts})
+        return total_payouts, total_orders, total_influencers, total(self.tracking, 'total_revenue')
+
+    def tracking_summary(self):
+        total_revenue = total(self.tracking, 'total_revenue')
+        total_rows = total(self.tracking, 'total_rows')
+        return TrackingDataSummarySerializer({
+            'total_revenue': total_revenue,
+            'total_orders': total(self.tracking, 'total_orders'),
+            'average_order_value': total_revenue / total_rows if total_rows else 0,
+            'total_campaigns': len({group['campaign'] for group in self.tracking}),
+            'total_brands': len({group['brand'] for group in self.tracking}),
+            'total_influencers': len({group['influencer'] for group in self.tracking}),
+            'date_range': self.filters.date_range
+        }).data
+
+    def tracking_by_campaign(self):
+        return self.totals('campaign')
+
+    def tracking_by_influencer(self):
+        return self.totals('influencer__name')
+
+    def tracking_roas_analysis(self):
+        total_revenue = total(self.tracking, 'total_revenue')
+        total_payouts = total(self.payouts, 'total_payout')
+        ratio = total_revenue / total_payouts if total_payouts > 0 else 0
+        return {
+            'total_revenue': total_revenue,
+            'total_payouts': total_payouts,
+            'roas': ratio,
+            'roas_percentage': ratio * 100
+        }
+
+    def payouts_summary(self):
+        total_payouts, total_orders, total_influencers, total_revenue = self.payout_totals()
+        return PayoutSummarySerializer({
+            'total_payouts': total_payouts,
+            'total_orders': total_orders,
+            'average_roas': roas(total_revenue, total_payouts),
+            'total_influencers': total_influencers,
+            'date_range': self.filters.date_range
+        }).data
+
+    def payouts_efficiency_metrics(self):
+        total_payouts, total_orders, total_influencers, total_revenue = self.payout_totals()
+        return {
+            'total_payouts': total_payouts,
+            'total_orders': total_orders,
+            'total_influencers': total_influencers,
+            'avg_payout_per_order': round(total_payouts / total_orders, 2) if total_orders > 0 else 0,
+            'avg_payout_per_influencer': round(total_payouts / total_influencers, 2) if total_influencers > 0 else 0,
+            'payout_efficiency': round(total_orders / total_influencers, 2) if total_influencers > 0 else 0,
+            'overall_roas': roas(total_revenue, total_payouts),
+            'total_revenue': total_revenue,
+            'date_range': self.filters.date_range
+        }
+
+    def payouts_by_basis(self):
+        # Revenue is not attributed to a basis, so every basis is compared with the overall revenue
+        total_revenue = total(self.tracking, 'total_revenue')
+        counts = distinct(self.payouts, 'basis')
+        rows = []
+        for basis, totals in regroup(self.payouts, 'basis', 'total_payout', 'total_orders', 'total_rate', 'payouts').items():
+            rows.append({
+                'basis': basis,
+                'total_payout': totals['total_payout'],
+                'total_orders': totals['total_orders'],
+                'avg_rate': totals['total_rate'] / totals['payouts'],
+                'influencer_count': counts[basis],
+                'avg_roas': roas(total_revenue, totals['total_payout']),
+            })
+        return sorted(rows, key=lambda row: row['total_payout'], reverse=True)
+
+    def grouped_with_revenue(self, field):
+        """Payouts per value of `field`, each with the revenue and ROAS of its group"""
+        revenue = regroup(self.tracking, field, 'total_revenue')
+        counts = distinct(self.payouts, field)
+        rows = []
+        for value, totals in regroup(self.payouts, field, 'total_payout', 'total_orders').items():
+            total_revenue = revenue[value]['total_revenue'] if value in revenue else 0
+            rows.append({
+                field: value,
+                'total_payout': totals['total_payout'],
+                'total_orders': totals['total_orders'],
+                'influencer_count': counts[value],
+                'avg_roas': roas(total_revenue, totals['total_payout']),
+                'total_revenue': total_revenue,
+            })
+        return sorted(rows, key=lambda row: row['total_payout'], reverse=True)
+
+    def payouts_by_platform(self):
+        return self.grouped_with_revenue('influencer__platform')
+
+    def payouts_by_category(self):
+        return self.grouped_with_revenue('influencer__category')
+
+    def payouts_by_influencer(self):
+        revenue = regroup(self.tracking, 'influencer', 'total_revenue')
+        names = {group['influencer']: group['influencer__name'] for group in self.payouts}
+        rows = []
+        for influencer, totals in regroup(self.payouts, 'influencer', 'total_payout', 'total_orders').items():
+            total_revenue = revenue[influencer]['total_revenue'] if influencer in revenue else 0
+            rows.append({
+                'influencer__name': names[influencer],
+                'total_payout': totals['total_payout'],
+                'total_orders': totals['total_orders'],
+                'avg_roas': roas(total_revenue, totals['total_payout']),
+            })
+        rows.sort(key=lambda row: row['influencer__name'])
+        return sorted(rows, key=lambda row: row['total_payout'], reverse=True)
+
+    def payouts_top_performers(self):
+        rows = [
+            {'influencer__name': name, **totals}
+            for name, totals in regroup(self.payouts, 'influencer__name', 'total_payout', 'total_orders').items()
+            if totals['total_payout'] > 0
+        ]
+        return sorted(rows, key=lambda row: row['total_payout'], reverse=True)[:10]
+
+
+PANELS = (
+    'tracking_summary',
+    'tracking_by_campaign',
+    'tracking_by_influencer',
+    'tracking_roas_analysis',
+    'payouts_summary',
+    'payouts_efficiency_metrics',
+    'payouts_by_basis',
+    'payouts_by_platform',
+    'payouts_by_category',
+    'payouts_by_influencer',
+    'payouts_top_performers',
+)
+
+
+def dashboard(params):
+    """Compute the requested panels (default: all) for the dashboard filters"""
+    panels = parse_list(params.get('panels'), PANELS, 'panels') or list(PANELS)
+    snapshot = Snapshot(FilterSpec.from_params(params))
+    return {
+        'date_range': snapshot.filters.date_range,
+        'panels': {panel: getattr(snapshot, panel)() for panel in panels},
+    }
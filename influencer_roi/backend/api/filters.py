@@ -0,0 +1,101 @@
+"""
+Filter compiler shared by the analytics endpoints
+
+The dashboard's sidebar filters are normalized once into a FilterSpec: a
+canonical, hashable value that produces the matching tracking and payout
+querysets and doubles as the cache key of an analytics response.
+"""
+from rest_framework.exceptions import ParseError
+
+from .ingest import parse_date
+
+# Filters on the influencer, applied to tracking data and payouts alike
+INFLUENCER_FILTERS = ('influencer__gender', 'influencer__platform', 'influencer__category')
+
+# Filters whose choices are stored lower-case
+LOWER_CASE_FILTERS = ('influencer__gender', 'influencer__platform')
+
+
+class FilterSpec:
+    """
+    Normalized dashboard filters: a date range, influencer attributes and a brand
+    """
+
+    def __init__(self, start_date=None, end_date=None, influencer=(), brand=None):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.influencer = tuple(sorted(influencer))
+        self.brand = brand
+
+    @classmethod
+    def from_params(cls, params):
+        """Compile request query params, raising ParseError for invalid dates"""
+        def clean(name):
+            value = params.get(name)
+            return value.strip() if value and value.strip() else None
+
+        start_date, end_date = clean('start_date'), clean('end_date')
+        try:
+            start_date = parse_date(start_date, 'Start') if start_date else None
+            end_date = parse_date(end_date, 'End') if end_date else None
+        except Exception as e:
+            raise ParseError(str(e))
+        # A range is only applied when both ends are given
+        if not (start_date and end_date):
+            start_date = end_date = None
+
+        influencer = []
+        for name in INFLUENCER_FILTERS:
+            value = clean(name)
+            if value:
+                influencer.append((name, value.lower() if name in LOWER_CASE_FILTERS else value))
+
+        return cls(start_date, end_date, influencer, clean('brand'))
+
+    @property
+    def key(self):
+        return (self.start_date, self.end_date, self.influencer, self.brand)
+
+    def __eq__(self, other):
+        return isinstance(other, FilterSpec) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f'FilterSpec{self.key!r}'
+
+    @property
+    def date_range(self):
+        if self.start_date:
+            return f"{self.start_date} to {self.end_date}"
+        return "All time"
+
+    def tracking(self, queryset):
+        """Filter a TrackingData or TrackingDailyRollup queryset"""
+        if self.start_date:
+            queryset = queryset.filter(date__range=[self.start_date, self.end_date])
+        if self.influencer:
+            queryset = queryset.filter(**dict(self.influencer))
+        if self.brand:
+            queryset = queryset.filter(brand=self.brand)
+        return queryset
+
+    def payouts(self, queryset):
+        """Filter a Payout queryset; payouts are not tied to a brand, so it is not applied"""
+        if self.start_date:
+            queryset = queryset.filter(payout_date__range=[self.start_date, self.end_date])
+        if self.influencer:
+            queryset = queryset.filter(**dict(self.influencer))
+        return queryset
+
+
+class AnalyticsFiltersMixin:
+    """
+    Compiles the request's dashboard filters for a viewset's analytics actions
+    """
+
+    def analytics_filters(self):
+        if not hasattr(self, '_analytics_filters'):
+            self._analytics_filters = FilterSpec.from_params(self.request.query_params)
+        return self._analytics_filters
@@ -0,0 +1,148 @@
+"""
+Content-hash idempotency for uploads
+
+Every completed upload is recorded with the SHA-256 of its bytes, its upsert
+and commit mode options and, when the client sends one, its Idempotency-Key.
+A byte-identical re-delivery with the same options is answered with the
+stored report of an error-free upload without reading a single row. A CSV or
+NDJSON file that starts with the exact bytes of an earlier error-free upload
+with the same options is loaded from the end of that prefix, so only the
+appended rows are processed. Uploads that reported row errors are loaded
+again in full, since the rows they rejected may load now.
+"""
+import hashlib
+
+from django.db import IntegrityError
+
+from .ingest import write_lock
+from .models import UploadRecord
+from .readers import find_reader, iter_chunks, read_csv, read_json, split_compression
+
+# Earlier uploads whose prefix hash is computed while hashing a new file
+MAX_PREFIX_CANDIDATES = 20
+
+
+class IdempotencyConflict(Exception):
+    """The Idempotency-Key was already used for a different file"""
+
+
+class Fingerprint:
+    """
+    Hash of an upload and the earlier upload it repeats or extends, if any
+    """
+
+    def __init__(self, file, model_type, file_name, options=None, idempotency_key=None, force=False):
+        self.model_type = model_type
+        self.file_name = file_name
+        options = options or {}
+        self.upsert = bool(options.get('upsert'))
+        self.commit_mode = options.get('commit_mode') or ''
+        self.idempotency_key = idempotency_key or None
+        self.duplicate = None
+        self.base = None
+
+        name, decompress = split_compression(file_name)
+        reader = find_reader(name)
+        line_based = decompress is None and reader in (read_csv, read_json)
+
+        # Earlier uploads only stand in for this one if they were loaded the same way
+        matching = UploadRecord.objects.filter(
+            model_type=model_type, upsert=self.upsert, commit_mode=self.commit_mode
+        )
+
+        candidates = []
+        if line_based and not force:
+            candidates = list(matching.filter(extendable=True)[:MAX_PREFIX_CANDIDATES])
+        self.content_hash, self.size, prefixes, first, last = self.hash(file, {c.size for c in candidates})
+
+        # A JSON array cannot be extended by appending objects
+        if reader is read_json and first == b'[':
+            line_based = False
+        self.extendable = line_based and last == b'\n'
+
+        if force:
+            return
+        if self.idempotency_key:
+            record = UploadRecord.objects.filter(idempotency_key=self.idempotency_key).first()
+            if record and (
+                record.content_hash != self.content_hash
+                or (record.upsert, record.commit_mode) != (self.upsert, self.commit_mode)
+            ):
+                raise IdempotencyConflict(
+                    f"Idempotency-Key '{self.idempotency_key}' was already used for a different file or options"
+                )
+            self.duplicate = record
+        if self.duplicate is None:
+            self.duplicate = matching.filter(
+                content_hash=self.content_hash, size=self.size, reusable=True
+            ).first()
+
+        if line_based and self.duplicate is None:
+            matches = [c for c in candidates if c.size < self.size and prefixes.get(c.size) == c.content_hash]
+            self.base = max(matches, key=lambda c: c.size, default=None)
+
+    def hash(self, file, boundaries):
+        """
+        Hash the file in one pass, also recording the hash of each prefix
+        ending at one of `boundaries`, then rewind it
+        """
+        digest = hashlib.sha256()
+        boundaries = sorted(boundaries)
+        prefixes = {}
+        position = 0
+        first = b''
+        last = b''
+        for chunk in iter_chunks(file):
+            if not first:
+                first = chunk.lstrip()[:1]
+            end = position + len(chunk)
+            start = 0
+            while boundaries and boundaries[0] <= end:
+                cut = boundaries.pop(0) - position
+                digest.update(chunk[start:cut])
+                start = cut
+                prefixes[position + cut] = digest.copy().hexdigest()
+            digest.update(chunk[start:])
+            position = end
+            last = chunk[-1:]
+        file.seek(0)
+        return digest.hexdigest(), position, prefixes, first, last
+
+    @property
+    def resume(self):
+        """Keyword arguments for `run_file()` that skip the rows of the base upload"""
+        if self.base is None:
+            return {}
+        return {'offset': self.base.size, 'skip': self.base.total_records}
+
+    def duplicate_result(self):
+        """Return the stored report of the upload this one repeats"""
+        return {
+            **self.duplicate.result,
+            'duplicate': True,
+            'duplicate_of': {
+                'file_name': self.duplicate.file_name,
+                'uploaded_at': self.duplicate.created_at,
+            },
+        }
+
+    def record(self, result):
+        """Remember a completed upload and its report"""
+        try:
+            with write_lock():
+                UploadRecord.objects.create(
+                    model_type=self.model_type,
+                    file_name=self.file_name,
+                    content_hash=self.content_hash,
+                    size=self.size,
+                    idempotency_key=self.idempotency_key,
+                    upsert=self.upsert,
+                    commit_mode=self.commit_mode,
+                    total_records=result['total_records'],
+                    reusable=not result['errors'],
+                    extendable=self.extendable and not result['errors'],
+                    result=result,
+                )
+        except IntegrityError:
+            # The same Idempotency-Key was recorded by a concurrent upload
+            pass
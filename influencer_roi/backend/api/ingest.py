@@ -0,0 +1,544 @@
+"""
+Batched ingestion engine for bulk uploads
+
+Rows are validated in Python, de-duplicated against the natural keys that
+already exist in the database (one query per batch) and written with
+bulk_create, instead of one get_or_create round trip per row. In upsert mode
+changed rows are written with the database's native ON CONFLICT DO UPDATE.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from influencers.engagement import EngagementDelta
+from influencers.models import Influencer, Post
+from tracking.models import TrackingData
+from tracking.rollup import RollupDelta, rollup_key
+from payouts.models import Payout
+from .readers import get_reader, open_tail
+
+# 'chunk' commits every batch in its own transaction so the write lock is only
+# held for one batch at a time; 'all' keeps the whole file in one transaction
+COMMIT_MODES = ('chunk', 'all')
+
+# SQLite allows a single writer, so imports running on several threads of
+# this process take turns instead of failing with "database is locked"
+_sqlite_write_lock = threading.Lock()
+
+
+@contextmanager
+def write_lock():
+    """Serialize import transactions when the database is SQLite"""
+    if connection.vendor == 'sqlite':
+        with _sqlite_write_lock:
+            yield
+    else:
+        yield
+
+
+def get_batch_size(value=None):
+    """Resolve the batch size from a request value or the UPLOAD_BATCH_SIZE setting"""
+    default = getattr(settings, 'UPLOAD_BATCH_SIZE', 5000)
+    if value in (None, ''):
+        return default
+    try:
+        batch_size = int(value)
+    except (TypeError, ValueError):
+        raise Exception(f"Invalid batch_size: '{value}'")
+    if batch_size < 1:
+        raise Exception(f"Invalid batch_size: '{value}'")
+    return min(batch_size, getattr(settings, 'UPLOAD_MAX_BATCH_SIZE', 20000))
+
+
+def get_commit_mode(value=None):
+    """Resolve the commit mode from a request value or the UPLOAD_COMMIT_MODE setting"""
+    if value in (None, ''):
+        return getattr(settings, 'UPLOAD_COMMIT_MODE', 'chunk')
+    if value not in COMMIT_MODES:
+        raise Exception(f"Invalid commit_mode: '{value}'. Must be one of: {list(COMMIT_MODES)}")
+    return value
+
+
+def parse_flag(value):
+    """Interpret a boolean request value such as '1' or 'true'"""
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def clean_options(model_type, batch_size=None, commit_mode=None, upsert=None):
+    """Validate upload options from a request and return loader keyword arguments"""
+    upsert = parse_flag(upsert)
+    if upsert and model_type in LOADERS and not LOADERS[model_type].update_fields:
+        raise Exception(f"Upsert is not supported for {model_type}")
+    return {
+        'batch_size': get_batch_size(batch_size),
+        'commit_mode': get_commit_mode(commit_mode),
+        'upsert': upsert,
+    }
+
+
+def parse_date(value, label):
+    """Validate a YYYY-MM-DD string and return it as a date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    value = value.strip()
+    if not value:
+        raise Exception(f"{label} date is required")
+    try:
+        # fromisoformat is much faster than strptime for the canonical form
+        if len(value) == 10 and value[4] == '-' and value[7] == '-':
+            return date.fromisoformat(value)
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise Exception(f"Invalid date format: '{value}'. Must be YYYY-MM-DD")
+
+
+def parse_amount(value):
+    """Convert a monetary value, keeping typed decimals from columnar uploads exact"""
+    if isinstance(value, Decimal):
+        return value
+    return float(value)
+
+
+class InfluencerIndex:
+    """
+    In-memory influencer name -> id map, loaded with a single query
+    """
+
+    def __init__(self):
+        self.ids = dict(Influencer.objects.values_list('name', 'id'))
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def add(self, name, influencer_id):
+        self.ids.setdefault(name, influencer_id)
+
+    def resolve(self, name):
+        """Return the id of the named influencer"""
+        try:
+            return self.ids[name]
+        except KeyError:
+            raise Exception(f"Influencer '{name}' not found")
+
+
+class BaseLoader:
+    """
+    Base class for batched loaders
+
+    Subclasses set `model`, `natural_key` (the attribute names that identify
+    an existing row) and `update_fields` (the values an upsert may change),
+    and implement `build()` and `existing()`.
+
+    Each batch is written inside its own transaction ('chunk' mode) or
+    inside a savepoint of a transaction spanning the whole file ('all' mode).
+    """
+    model = None
+    natural_key = ()
+    data_tables = ()  # Tables whose cached analytics a written batch invalidates (all when empty)
+    update_fields = ()
+    # Choice columns, stored as sent; the default fills in when a row has no such column
+    choice_defaults = {}
+
+    def __init__(self, index, batch_size=None, commit_mode=None, upsert=False):
+        self.index = index
+        self.batch_size = get_batch_size(batch_size)
+        self.commit_mode = get_commit_mode(commit_mode)
+        self.upsert = upsert
+        self.chunks_committed = 0
+        self.total_records = 0
+        self.created_count = 0
+        self.updated_count = 0
+        self.skipped_count = 0
+        self.rolled_back = False
+        self.previous = {}
+        self._errors = []
+
+    def build(self, row):
+        """Validate a raw row and return it as an unsaved row from `make()`"""
+        raise NotImplementedError
+
+    def make(self, **values):
+        """Return an unsaved row from attribute values, here a model instance"""
+        return self.model(**values)
+
+    def choice(self, row, column):
+        return row.get(column, self.choice_defaults[column])
+
+    def existing(self, objs):
+        """Return a queryset covering the stored rows that may match `objs`"""
+        raise NotImplementedError
+
+    def existing_keys(self, objs):
+        """Return the natural keys of `objs` that are already stored"""
+        return set(self.existing(objs).order_by().values_list(*self.natural_key))
+
+    def existing_values(self, objs):
+        """Return a map of stored natural key -> update field values"""
+        size = len(self.natural_key)
+        rows = self.existing(objs).order_by().values_list(*self.natural_key, *self.update_fields)
+        return {row[:size]: row[size:] for row in rows}
+
+    def key(self, obj):
+        return tuple(getattr(obj, field) for field in self.natural_key)
+
+    def values(self, obj):
+        """Return the update field values of `obj` as the database would store them"""
+        opts = self.model._meta
+        return tuple(
+            opts.get_field(field).to_python(getattr(obj, field))
+            for field in self.update_fields
+        )
+
+    def load(self, rows):
+        """Validate, de-duplicate and write rows in batches"""
+        batch = []
+        for row in rows:
+            self.total_records += 1
+            try:
+                obj = self.build(row)
+            except Exception as e:
+                self.add_error(self.total_records, e)
+                continue
+
+            batch.append((self.total_records, obj))
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+
+        if batch:
+            self.flush(batch)
+
+    def run(self, rows):
+        """Load rows using the configured commit mode and return the upload report"""
+        if self.commit_mode == 'all':
+            with write_lock(), transaction.atomic():
+                self.load(rows)
+                if self._errors:
+                    transaction.set_rollback(True)
+                    self.discard()
+            return self.result()
+
+        try:
+            self.load(rows)
+        except Exception as e:
+            committed = self.created_count + self.updated_count
+            if committed:
+                raise Exception(f"{e} ({committed} records were already committed)") from e
+            raise
+        return self.result()
+
+    def run_file(self, file, filename, offset=0, skip=0):
+        """
+        Stream the rows of a file through `run()`
+
+        With an `offset` only the rows after that byte are read; `skip` is
+        the number of rows before it, which were loaded by an earlier upload.
+        """
+        if offset:
+            file = open_tail(file, filename, offset)
+            self.total_records = self.skipped_count = skip
+        return self.run(get_reader(filename)(file))
+
+    def flush(self, batch):
+        """Write a batch in its own transaction, or savepoint in 'all' mode"""
+        if self.commit_mode == 'all':
+            with transaction.atomic():
+                self.write_batch(batch)
+        else:
+            with write_lock(), transaction.atomic():
+                self.write_batch(batch)
+        self.chunks_committed += 1
+
+    def write_batch(self, batch):
+        """Write the rows of a batch that are new, or changed in upsert mode"""
+        from .cache import data_changed
+        self.previous = {}
+        if self.upsert:
+            pending = self.changed_rows(batch)
+        else:
+            pending = self.new_rows(batch)
+
+        if pending:
+            self.write(pending)
+            data_changed(*self.data_tables)
+
+    def new_rows(self, batch):
+        """Return the rows of a batch whose natural key is not stored yet"""
+        seen = self.existing_keys([obj for _, obj in batch])
+        new_rows = []
+        for row_number, obj in batch:
+            key = self.key(obj)
+            if key in seen:
+                continue
+            seen.add(key)
+            new_rows.append((row_number, obj, 'inserted'))
+        return new_rows
+
+    def changed_rows(self, batch):
+        """
+        Return the rows of a batch that are new or differ from the stored
+        values, keeping the stored values of the rows to update in `previous`
+        """
+        stored = self.existing_values([obj for _, obj in batch])
+        pending = {}
+        for row_number, obj in batch:
+            key = self.key(obj)
+            values = self.values(obj)
+            if key in stored and stored[key] == values:
+                continue
+            if key in stored and key not in pending:
+                self.previous[key] = stored[key]
+
+            # A later row for the same key replaces the earlier one
+            outcome = 'updated' if key in stored else 'inserted'
+            if key in pending:
+                outcome = pending[key][2]
+            pending[key] = (row_number, obj, outcome)
+            stored[key] = values
+        return list(pending.values())
+
+    def insert(self, objs):
+        """Insert instances, updating rows whose natural key already exists in upsert mode"""
+        if self.upsert:
+            opts = self.model._meta
+            self.model.objects.bulk_create(
+                objs,
+                batch_size=self.batch_size,
+                update_conflicts=True,
+                unique_fields=[opts.get_field(field).name for field in self.natural_key],
+                update_fields=[*self.update_fields, 'updated_at'],
+            )
+        else:
+            self.model.objects.bulk_create(objs, batch_size=self.batch_size)
+
+    def write(self, rows):
+        """Bulk write rows, falling back to a savepoint per row to isolate failures"""
+        try:
+            with transaction.atomic():
+                self.insert([obj for _, obj, _ in rows])
+        except Exception:
+            pass
+        else:
+            for row in rows:
+                self.count(row)
+            self.after_write([obj for _, obj, _ in rows])
+            return
+
+        for row in rows:
+            row_number, obj, _ = row
+            try:
+                with transaction.atomic():
+                    self.insert([obj])
+            except Exception as e:
+                self.add_error(row_number, e)
+                continue
+            self.count(row)
+            self.after_write([obj])
+
+    def discard(self):
+        """Forget the writes of a rolled back 'all' mode load"""
+        self.rolled_back = True
+        self.created_count = 0
+        self.updated_count = 0
+        self.chunks_committed = 0
+
+    def count(self, row):
+        if row[2] == 'updated':
+            self.updated_count += 1
+        else:
+            self.created_count += 1
+
+    def after_write(self, objs):
+        """Hook called with the rows that were written"""
+
+    def add_error(self, row_number, error):
+        self._errors.append((row_number, str(error)))
+
+    @property
+    def errors(self):
+        return [f"Row {row_number}: {message}" for row_number, message in sorted(self._errors)]
+
+    def result(self):
+        """Return the upload report"""
+        existing_count = self.total_records - self.created_count
+        report = {
+            'message': f'Processed {self.total_records} records: {self.created_count} created, {existing_count} already existed',
+            'created_count': self.created_count,
+            'existing_count': existing_count,
+            'total_records': self.total_records,
+            'commit_mode': self.commit_mode,
+            'chunks_committed': self.chunks_committed,
+            'errors': self.errors,
+        }
+        if self.upsert:
+            unchanged_count = existing_count - self.updated_count - len(self._errors)
+            report.update({
+                'message': f'Processed {self.total_records} records: {self.created_count} inserted, {self.updated_count} updated, {unchanged_count} unchanged',
+                'inserted_count': self.created_count,
+                'updated_count': self.updated_count,
+                'unchanged_count': unchanged_count,
+            })
+        if self.rolled_back:
+            report.update({
+                'message': f'Rolled back {self.total_records} records: {len(self._errors)} had errors, nothing was written',
+                'rolled_back': True,
+            })
+        if self.skipped_count:
+            report['skipped_count'] = self.skipped_count
+            report['message'] += f' ({self.skipped_count} loaded by an earlier upload were skipped)'
+        return report
+
+
+class InfluencerLoader(BaseLoader):
+    """Loader for influencers, keyed by name"""
+    model = Influencer
+    natural_key = ('name',)
+    data_tables = ('influencers',)
+    choice_defaults = {'gender': 'other', 'platform': 'instagram'}
+
+    def build(self, row):
+        return self.make(
+            name=row['name'],
+            category=row.get('category', ''),
+            gender=self.choice(row, 'gender'),
+            follower_count=int(row.get('follower_count', 0)),
+            platform=self.choice(row, 'platform'),
+        )
+
+    def existing_keys(self, objs):
+        return {(obj.name,) for obj in objs if obj.name in self.index}
+
+    def after_write(self, objs):
+        for obj in objs:
+            self.index.add(obj.name, obj.id)
+
+
+class PostLoader(BaseLoader):
+    """Loader for posts, keyed by influencer/date/platform"""
+    model = Post
+    natural_key = ('influencer_id', 'date', 'platform')
+    data_tables = ('posts', 'influencers')
+    update_fields = ('url', 'caption', 'reach', 'likes', 'comments')
+    choice_defaults = {'platform': 'instagram'}
+
+    def build(self, row):
+        influencer_id = self.index.resolve(row['influencer_name'])
+        return self.make(
+            influencer_id=influencer_id,
+            date=parse_date(row['date'], 'Post'),
+            platform=self.choice(row, 'platform'),
+            url=row.get('url', ''),
+            caption=row.get('caption', ''),
+            reach=int(row.get('reach', 0)),
+            likes=int(row.get('likes', 0)),
+            comments=int(row.get('comments', 0)),
+        )
+
+    def after_write(self, objs):
+        """Add the written posts to their influencers' engagement totals"""
+        delta = EngagementDelta()
+        for obj in objs:
+            delta.add(obj.influencer_id, obj.reach, obj.likes, obj.comments)
+            previous = self.previous and self.previous.get(self.key(obj))
+            if previous:
+                _, _, reach, likes, comments = previous
+                delta.add(obj.influencer_id, reach, likes, comments, sign=-1)
+        delta.apply()
+
+    def existing(self, objs):
+        return Post.objects.filter(
+            influencer_id__in={obj.influencer_id for obj in objs},
+            date__in={obj.date for obj in objs},
+        )
+
+
+class TrackingDataLoader(BaseLoader):
+    """Loader for tracking data, keyed by the model's unique_together"""
+    model = TrackingData
+    natural_key = ('user_id', 'date', 'product', 'influencer_id')
+    data_tables = ('tracking',)
+    update_fields = ('source', 'campaign', 'brand', 'orders', 'revenue')
+
+    def build(self, row):
+        influencer_id = self.index.resolve(row['influencer_name'])
+        return self.make(
+            user_id=str(row['user_id']),
+            date=parse_date(row['date'], 'Tracking'),
+            product=str(row['product']),
+            influencer_id=influencer_id,
+            source=row.get('source', ''),
+            campaign=row.get('campaign', ''),
+            brand=row.get('brand', ''),
+            orders=int(row.get('orders', 0)),
+            revenue=parse_amount(row.get('revenue', 0)),
+        )
+
+    def after_write(self, objs):
+        """Move the written rows into their daily rollup groups"""
+        delta = RollupDelta()
+        for obj in objs:
+            delta.add(rollup_key(obj), obj.orders, obj.revenue)
+            previous = self.previous and self.previous.get(self.key(obj))
+            if previous:
+                source, campaign, brand, orders, revenue = previous
+                delta.add((obj.date, obj.influencer_id, brand, campaign, source), orders, revenue, sign=-1)
+        delta.apply()
+
+    def existing(self, objs):
+        # Filtering on user_id and date keeps the lookup on the unique index
+        # instead of the much less selective influencer foreign key index
+        return TrackingData.objects.filter(
+            user_id__in={obj.user_id for obj in objs},
+            date__in={obj.date for obj in objs},
+        )
+
+
+class PayoutLoader(BaseLoader):
+    """Loader for payouts, keyed by influencer/payout_date/basis"""
+    model = Payout
+    natural_key = ('influencer_id', 'payout_date', 'basis')
+    data_tables = ('payouts',)
+    update_fields = ('rate', 'orders', 'total_payout')
+    choice_defaults = {'basis': 'post'}
+
+    def build(self, row):
+        influencer_id = self.index.resolve(row['influencer_name'])
+        return self.make(
+            influencer_id=influencer_id,
+            payout_date=parse_date(row['payout_date'], 'Payout'),
+            basis=self.choice(row, 'basis'),
+            rate=parse_amount(row.get('rate', 0)),
+            orders=int(row.get('orders', 0)),
+            total_payout=parse_amount(row.get('total_payout', 0)),
+        )
+
+    def existing(self, objs):
+        return Payout.objects.filter(
+            influencer_id__in={obj.influencer_id for obj in objs},
+            payout_date__in={obj.payout_date for obj in objs},
+        )
+
+
+LOADERS = {
+    'influencers': InfluencerLoader,
+    'posts': PostLoader,
+    'tracking': TrackingDataLoader,
+    'payouts': PayoutLoader,
+}
+
+
+def create_loader(model_type, **options):
+    """Create the native loader for a model type with a freshly loaded influencer index"""
+    from .archive import ARCHIVE, ArchiveLoader
+    from .native import NATIVE_LOADERS
+    if model_type == ARCHIVE:
+        return ArchiveLoader(**options)
+    return NATIVE_LOADERS[model_type](InfluencerIndex(), **options)
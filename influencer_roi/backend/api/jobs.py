@@ -0,0 +1,295 @@
+"""
+Background import jobs for bulk uploads
+
+Uploaded files are stored on local disk and imported on a thread pool, so
+the request that submitted them returns immediately. A job reports live
+progress from the process running it; its status report is also stored at
+every state change and every UPLOAD_JOB_HEARTBEAT seconds while it runs, so
+other worker processes, and the same one after a restart, can report it as
+of that change. A queued or running job whose report has not been stored for
+UPLOAD_JOB_STALE_AFTER seconds belonged to a process that stopped, and is
+reported as failed.
+
+A job stores its report from the worker thread when it starts and finishes;
+the other bookkeeping writes are made by a single record thread, so that
+queueing a job or reading its status never waits on an import holding the
+write lock.
+"""
+import functools
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.utils import timezone
+
+from .ingest import clean_options, create_loader, write_lock
+from .models import ImportJobRecord
+from .readers import READ_CHUNK_SIZE
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+_executor = None
+_writes = queue.Queue()
+_recorder = None
+
+
+def get_executor():
+    """Return the shared worker pool, creating it on first use"""
+    global _executor
+    with _jobs_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'UPLOAD_JOB_WORKERS', 2),
+                thread_name_prefix='upload-job'
+            )
+    return _executor
+
+
+def defer_write(write, *args, **kwargs):
+    """Hand a small bookkeeping write to the record thread"""
+    global _recorder
+    with _jobs_lock:
+        if _recorder is None:
+            _recorder = threading.Thread(target=record_writes, name='upload-job-records', daemon=True)
+            _recorder.start()
+    _writes.put(functools.partial(write, *args, **kwargs))
+
+
+def record_writes():
+    """
+    Run deferred writes in order, and store the report of every queued or
+    running job each UPLOAD_JOB_HEARTBEAT seconds
+    """
+    heartbeat = getattr(settings, 'UPLOAD_JOB_HEARTBEAT', 30)
+    next_beat = time.monotonic() + heartbeat
+    pending = []
+    while True:
+        try:
+            pending.append(_writes.get(timeout=max(next_beat - time.monotonic(), 0)))
+        except queue.Empty:
+            pass
+        if time.monotonic() >= next_beat:
+            next_beat = time.monotonic() + heartbeat
+            with _jobs_lock:
+                pending.extend(job.write_record for job in _jobs.values() if job.status in ACTIVE_STATUSES)
+        while pending:
+            try:
+                with write_lock():
+                    pending[0]()
+            except OperationalError:
+                # Still locked after the database timeout; retry on the next write or heartbeat
+                break
+            except Exception:
+                # A bad write is dropped rather than retried forever
+                pass
+            pending.pop(0)
+
+
+class ProgressFile:
+    """
+    Binary file wrapper recording how far a reader has got through the file
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.bytes_read = self.file.tell()
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+
+class ImportJob:
+    """
+    A queued or running import of one stored upload
+    """
+
+    def __init__(self, model_type, file_name, path, options, fingerprint=None):
+        self.id = uuid.uuid4().hex
+        self.model_type = model_type
+        self.file_name = file_name
+        self.path = path
+        self.options = options
+        self.fingerprint = fingerprint
+        self.total_bytes = os.path.getsize(path)
+        self.status = 'queued'
+        self.loader = None
+        self.result = None
+        self.error = None
+        self.created_at = timezone.now()
+        self.started_at = None
+        self.finished_at = None
+        self._started = None
+        self._finished = None
+        self._file = None
+
+    def save(self):
+        """Store the current status report for other processes"""
+        with write_lock():
+            self.write_record()
+
+    def write_record(self):
+        ImportJobRecord.objects.update_or_create(
+            id=self.id,
+            defaults={'status': self.status, 'report': self.to_dict()}
+        )
+
+    def run(self):
+        """Import the stored file; called on a worker thread"""
+        self.status = 'running'
+        self.started_at = timezone.now()
+        self._started = time.monotonic()
+        try:
+            self.save()
+            self.loader = create_loader(self.model_type, **self.options)
+            with open(self.path, 'rb') as f:
+                self._file = ProgressFile(f)
+                resume = self.fingerprint.resume if self.fingerprint else {}
+                self.result = self.loader.run_file(self._file, self.file_name, **resume)
+            if self.fingerprint:
+                self.fingerprint.record(self.result)
+            self.status = 'completed'
+        except Exception as e:
+            self.error = f'Upload failed: {str(e)}'
+            self.status = 'failed'
+        finally:
+            self._finished = time.monotonic()
+            self.finished_at = timezone.now()
+            try:
+                self.save()
+            finally:
+                connection.close()
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+
+    def to_dict(self):
+        """Return the job status report"""
+        loader = self.loader
+        rows_processed = loader.total_records if loader else 0
+        created_count = loader.created_count if loader else 0
+        bytes_read = self._file.bytes_read if self._file else 0
+        elapsed = 0
+        if self._started is not None:
+            elapsed = (self._finished or time.monotonic()) - self._started
+
+        return {
+            'id': self.id,
+            'status': self.status,
+            'model_type': self.model_type,
+            'file_name': self.file_name,
+            'commit_mode': self.options['commit_mode'],
+            'upsert': self.options['upsert'],
+            'rows_processed': rows_processed,
+            'created_count': created_count,
+            'existing_count': rows_processed - created_count,
+            'errors': loader.errors if loader else [],
+            'bytes_read': bytes_read,
+            'total_bytes': self.total_bytes,
+            'progress': round(bytes_read / self.total_bytes, 4) if self.total_bytes else 1,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(rows_processed / elapsed, 1) if elapsed > 0 else 0,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'result': self.result,
+            'error': self.error,
+        }
+
+
+def store_upload(file):
+    """Copy an uploaded file to the job directory and return its path"""
+    upload_dir = getattr(settings, 'UPLOAD_JOB_DIR', None) or tempfile.gettempdir()
+    os.makedirs(upload_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix='upload-', dir=upload_dir)
+    with os.fdopen(fd, 'wb') as f:
+        for chunk in file.chunks(READ_CHUNK_SIZE):
+            f.write(chunk)
+    return path
+
+
+def submit_import(model_type, file, fingerprint=None, **options):
+    """Store an uploaded file and queue its import, returning the job"""
+    options = clean_options(model_type, **options)
+    return queue_import(model_type, file.name, store_upload(file), options, fingerprint)
+
+
+def queue_import(model_type, file_name, path, options, fingerprint=None):
+    """Queue the import of a stored file; the job removes the file when done"""
+    job = ImportJob(model_type, file_name, path, options, fingerprint)
+    defer_write(job.write_record)
+    with _jobs_lock:
+        _jobs[job.id] = job
+        prune_jobs()
+    defer_write(prune_job_records)
+    get_executor().submit(job.run)
+    return job
+
+
+class StoredJob:
+    """
+    A job run by another process, or before a restart, as last stored
+    """
+
+    def __init__(self, record):
+        self.id = record.id
+        self.status = record.status
+        self.report = record.report
+
+    @classmethod
+    def load(cls, record):
+        """Read a stored job, failing it if the process running it has stopped"""
+        stale_after = getattr(settings, 'UPLOAD_JOB_STALE_AFTER', 10 * 60)
+        if record.status in ACTIVE_STATUSES and record.updated_at < timezone.now() - timedelta(seconds=stale_after):
+            report = {
+                **record.report,
+                'status': 'failed',
+                'error': 'Upload failed: the process running the import stopped',
+            }
+            # Only if no report was stored since it was read
+            defer_write(ImportJobRecord.objects.filter(
+                id=record.id, status=record.status, updated_at=record.updated_at
+            ).update, status='failed', report=report, updated_at=timezone.now())
+            record.status, record.report = 'failed', report
+        return cls(record)
+
+    def to_dict(self):
+        return self.report
+
+
+def get_job(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is None:
+        record = ImportJobRecord.objects.filter(id=job_id).first()
+        job = StoredJob.load(record) if record else None
+    return job
+
+
+def prune_jobs():
+    """Forget the oldest finished jobs beyond UPLOAD_JOB_HISTORY"""
+    limit = getattr(settings, 'UPLOAD_JOB_HISTORY', 100)
+    finished = [job for job in _jobs.values() if job.status in ('completed', 'failed')]
+    for job in finished[:max(len(finished) - limit, 0)]:
+        del _jobs[job.id]
+
+
+def prune_job_records():
+    """Delete the stored reports of the oldest finished jobs beyond UPLOAD_JOB_HISTORY"""
+    limit = getattr(settings, 'UPLOAD_JOB_HISTORY', 100)
+    stale = ImportJobRecord.objects.filter(status__in=('completed', 'failed')).values_list('id', flat=True)[limit:]
+    ImportJobRecord.objects.filter(id__in=list(stale)).delete()
@@ -0,0 +1,138 @@
+import re
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve
+from rest_framework.test import APIRequestFactory
+
+# Analytics endpoints called by the dashboard
+ENDPOINTS = [
+    'tracking/summary',
+    'tracking/by_campaign',
+    'tracking/by_influencer',
+    'tracking/roas_analysis',
+    'payouts/summary',
+    'payouts/by_basis',
+    'payouts/by_platform',
+    'payouts/by_category',
+    'payouts/efficiency_metrics',
+    'payouts/by_influencer',
+    'payouts/top_performers',
+    'analytics/pivot',
+    'dashboard',
+]
+
+# Sidebar filters combined with the date range
+FILTERS = [
+    {},
+    {'brand': 'audit'},
+    {'influencer__platform': 'instagram'},
+    {'influencer__category': 'Fashion'},
+    {'influencer__gender': 'female'},
+    {'influencer__platform': 'instagram', 'influencer__category': 'Fashion', 'influencer__gender': 'female'},
+]
+
+# List endpoints with the filters their indexes serve; the date range does not apply
+LIST_ENDPOINTS = {
+    'tracking': [
+        {'brand': 'audit'},
+        {'campaign': 'audit'},
+        {'brand': 'audit', 'count': 'false'},
+        {'campaign': 'audit', 'count': 'false'},
+    ],
+}
+
+AUDITED_TABLES = ('tracking_data', 'tracking_daily_rollup', 'payouts')
+
+FULL_SCAN = {
+    'sqlite': re.compile(r'^SCAN (%s)\b' % '|'.join(AUDITED_TABLES)),
+    'postgresql': re.compile(r'Seq Scan on (%s)\b' % '|'.join(AUDITED_TABLES)),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Run EXPLAIN for every query of the analytics and filtered list endpoints '
+        'and fail if any of them falls back to a full scan of tracking data or payouts'
+    )
+
+    def add_arguments(self, parser):
+        today = date.today()
+        parser.add_argument('--start-date', default=str(today - timedelta(days=30)), help='Start of the audited date range')
+        parser.add_argument('--end-date', default=str(today), help='End of the audited date range')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in FULL_SCAN:
+            raise CommandError(f'Query plans cannot be audited on {connection.vendor}')
+
+        factory = APIRequestFactory()
+        failures = []
+        for endpoint, params in self.requests(options):
+            label = f'{endpoint}?{urlencode(params)}'
+            plans = self.capture_plans(factory, f'/api/{endpoint}/', params)
+
+            scans = [(sql, plan) for sql, plan in plans if self.full_scans(plan)]
+            failures += [(label, sql, plan) for sql, plan in scans]
+            status = self.style.ERROR('FULL SCAN') if scans else self.style.SUCCESS('ok')
+            self.stdout.write(f'{status} {label} ({len(plans)} queries)')
+            if options['verbosity'] > 1:
+                for sql, plan in plans:
+                    self.stdout.write(f'  {sql}')
+                    for line in plan:
+                        self.stdout.write(f'    {line}')
+
+        for label, sql, plan in failures:
+            self.stderr.write(f'\n{label}\n  {sql}')
+            for line in plan:
+                self.stderr.write(f'    {line}')
+        if failures:
+            raise CommandError(f'{len(failures)} queries fall back to a full scan of {" or ".join(AUDITED_TABLES)}')
+
+    def requests(self, options):
+        """Yield (endpoint, params) for every audited request"""
+        for endpoint in ENDPOINTS:
+            for filters in FILTERS:
+                yield endpoint, {'start_date': options['start_date'], 'end_date': options['end_date'], **filters}
+        for endpoint, filter_sets in LIST_ENDPOINTS.items():
+            for filters in filter_sets:
+                yield endpoint, filters
+
+    def capture_plans(self, factory, path, params):
+        """Call an endpoint and return (sql, plan) for each distinct audited query it ran"""
+        match = resolve(path)
+        # A cached response would run no queries to explain
+        with override_settings(ANALYTICS_CACHE=None), CaptureQueriesContext(connection) as queries:
+            response = match.func(factory.get(path, params), *match.args, **match.kwargs)
+            response.render()
+        if response.status_code != 200:
+            raise CommandError(f'{path} returned {response.status_code}: {response.content[:200]}')
+
+        plans = []
+        seen = set()
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if sql in seen or not re.search(r'\b(%s)\b' % '|'.join(AUDITED_TABLES), sql):
+                continue
+            seen.add(sql)
+            plans.append((sql, self.explain(sql)))
+        return plans
+
+    def explain(self, sql):
+        """Return the plan lines of a query"""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                return [row[-1] for row in cursor.fetchall()]
+
+            # With sequential scans disabled the planner only picks one when no index applies
+            with transaction.atomic():
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute(f'EXPLAIN {sql}')
+                return [row[0] for row in cursor.fetchall()]
+
+    def full_scans(self, plan):
+        pattern = FULL_SCAN[connection.vendor]
+        return [line for line in plan if pattern.search(line)]
@@ -0,0 +1,137 @@
+import glob
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.ingest import COMMIT_MODES, LOADERS, InfluencerIndex
+from api.native import NATIVE_LOADERS, bulk_load_session
+from api.readers import get_reader
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream local influencer, post, tracking and payout files into the database '
+        'using the native bulk path of the configured backend'
+    )
+
+    def add_arguments(self, parser):
+        for model_type in LOADERS:
+            parser.add_argument(
+                f'--{model_type}',
+                nargs='+',
+                default=[],
+                metavar='PATH',
+                help=f'{model_type} files or glob patterns (CSV/JSON/Parquet/Arrow, optionally compressed)'
+            )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'UPLOAD_MAX_BATCH_SIZE', 5000),
+            help='Rows written per batch'
+        )
+        parser.add_argument('--commit-mode', choices=COMMIT_MODES, help="'chunk' commits each batch, 'all' each file")
+        parser.add_argument('--upsert', action='store_true', help='Update changed posts, tracking and payout rows')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Files loaded in parallel (SQLite serializes writes, so this mainly helps PostgreSQL)'
+        )
+        parser.add_argument('--progress-interval', type=float, default=5, help='Seconds between progress lines')
+
+    def handle(self, *args, **options):
+        files = []
+        for model_type in LOADERS:
+            for pattern in options[model_type]:
+                paths = sorted(glob.glob(pattern)) or [pattern]
+                for path in paths:
+                    if get_reader(path) is None:
+                        raise CommandError(f'Unsupported file format: {path}')
+                    files.append((model_type, path))
+        if not files:
+            raise CommandError(f'Pass at least one of: {", ".join("--" + name for name in LOADERS)}')
+
+        self.options = options
+        self.index = InfluencerIndex()
+        self.running = {}
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        started = time.monotonic()
+
+        reporter = threading.Thread(target=self.report_progress, daemon=True)
+        reporter.start()
+        try:
+            # Influencers must be committed before anything referencing them is loaded
+            results = self.load_all([f for f in files if f[0] == 'influencers'])
+            results += self.load_all([f for f in files if f[0] != 'influencers'])
+        finally:
+            self.done.set()
+            reporter.join()
+
+        elapsed = time.monotonic() - started
+        total = sum(result['total_records'] for _, result in results)
+        created = sum(result['created_count'] for _, result in results)
+        failed = sum(len(result['errors']) for _, result in results)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {len(results)} files: {total:,} records, {created:,} created, '
+            f'{failed:,} errors in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/sec)'
+        ))
+
+    def load_all(self, files):
+        """Load files on up to --workers threads, returning (path, result) pairs"""
+        workers = max(self.options['workers'], 1)
+        if workers == 1 or len(files) < 2:
+            return [self.load_file(model_type, path) for model_type, path in files]
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(self.load_worker, model_type, path) for model_type, path in files]
+            return [future.result() for future in futures]
+
+    def load_worker(self, model_type, path):
+        try:
+            return self.load_file(model_type, path)
+        finally:
+            connection.close()
+
+    def load_file(self, model_type, path):
+        """Load one file with the native loader and print its report"""
+        loader = NATIVE_LOADERS[model_type](
+            self.index,
+            batch_size=self.options['batch_size'],
+            commit_mode=self.options['commit_mode'],
+            upsert=self.options['upsert'] and bool(LOADERS[model_type].update_fields)
+        )
+        with self.lock:
+            self.running[path] = (loader, time.monotonic())
+        try:
+            with bulk_load_session(), open(path, 'rb') as f:
+                result = loader.run_file(f, path)
+        except Exception as e:
+            raise CommandError(f'{path}: {e}')
+        finally:
+            with self.lock:
+                _, file_started = self.running.pop(path)
+
+        elapsed = time.monotonic() - file_started
+        rate = result['total_records'] / elapsed if elapsed else 0
+        self.stdout.write(f'{path}: {result["message"]} in {elapsed:.1f}s ({rate:,.0f} rows/sec)')
+        for error in result['errors'][:10]:
+            self.stderr.write(f'  {error}')
+        if len(result['errors']) > 10:
+            self.stderr.write(f'  ... {len(result["errors"]) - 10} more errors')
+        return path, result
+
+    def report_progress(self):
+        """Print rows/sec for every running file until the import finishes"""
+        while not self.done.wait(self.options['progress_interval']):
+            with self.lock:
+                running = list(self.running.items())
+            now = time.monotonic()
+            for path, (loader, file_started) in running:
+                elapsed = now - file_started
+                rate = loader.total_records / elapsed if elapsed else 0
+                self.stdout.write(f'{path}: {loader.total_records:,} rows ({rate:,.0f} rows/sec)')
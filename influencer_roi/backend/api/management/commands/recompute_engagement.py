@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.cache import data_changed
+from api.ingest import write_lock
+from influencers.engagement import recompute
+
+
+class Command(BaseCommand):
+    help = "Recompute every influencer's stored post count, reach and engagement rate from its posts"
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        with write_lock():
+            count = recompute()
+        data_changed('influencers')
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Recomputed engagement for {count:,} influencers in {elapsed:.1f}s'))
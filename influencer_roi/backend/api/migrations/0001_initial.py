@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_type', models.CharField(help_text='Type of data that was uploaded', max_length=20)),
+                ('file_name', models.CharField(help_text='Name of the uploaded file', max_length=255)),
+                ('content_hash', models.CharField(db_index=True, help_text='SHA-256 of the uploaded bytes', max_length=64)),
+                ('size', models.BigIntegerField(help_text='Size of the uploaded file in bytes')),
+                ('idempotency_key', models.CharField(blank=True, help_text='Idempotency-Key header sent with the upload', max_length=255, null=True, unique=True)),
+                ('total_records', models.IntegerField(default=0, help_text='Rows read from the file')),
+                ('extendable', models.BooleanField(default=False, help_text='Whether a later file starting with these bytes only needs its new rows loaded')),
+                ('result', models.JSONField(help_text='Upload report returned for the import')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Upload Record',
+                'verbose_name_plural': 'Upload Records',
+                'db_table': 'upload_records',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadrecord',
+            name='commit_mode',
+            field=models.CharField(blank=True, help_text='Commit mode the upload was loaded with', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='uploadrecord',
+            name='reusable',
+            field=models.BooleanField(default=False, help_text='Whether a byte-identical upload with the same options can be answered with this result'),
+        ),
+        migrations.AddField(
+            model_name='uploadrecord',
+            name='upsert',
+            field=models.BooleanField(default=False, help_text='Whether the upload was loaded in upsert mode'),
+        ),
+    ]
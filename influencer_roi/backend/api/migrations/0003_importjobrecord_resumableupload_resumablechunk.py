@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:53
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_uploadrecord_commit_mode_uploadrecord_reusable_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJobRecord',
+            fields=[
+                ('id', models.CharField(editable=False, max_length=32, primary_key=True, serialize=False)),
+                ('status', models.CharField(help_text='queued, running, completed or failed', max_length=20)),
+                ('report', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Job status report as of the last state change')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Import Job',
+                'verbose_name_plural': 'Import Jobs',
+                'db_table': 'import_jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumableUpload',
+            fields=[
+                ('id', models.CharField(editable=False, max_length=32, primary_key=True, serialize=False)),
+                ('model_type', models.CharField(help_text='Type of data being uploaded', max_length=20)),
+                ('file_name', models.CharField(help_text='Name of the file being uploaded', max_length=255)),
+                ('total_size', models.BigIntegerField(help_text='Size of the complete file in bytes')),
+                ('chunk_size', models.IntegerField(help_text='Size of every chunk but the last in bytes')),
+                ('options', models.JSONField(help_text='Loader options the import will run with')),
+                ('path', models.CharField(help_text='Pre-sized file the chunks are written into', max_length=1024)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='When the last chunk arrived')),
+            ],
+            options={
+                'verbose_name': 'Resumable Upload',
+                'verbose_name_plural': 'Resumable Uploads',
+                'db_table': 'resumable_uploads',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumableChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.IntegerField(help_text='Position of the chunk in the file')),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='api.resumableupload')),
+            ],
+            options={
+                'db_table': 'resumable_chunks',
+                'unique_together': {('upload', 'index')},
+            },
+        ),
+    ]
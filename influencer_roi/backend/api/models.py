@@ -0,0 +1,116 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def use_wal_journal(sender, connection, **kwargs):
+    """
+    Let SQLite readers carry on while an import holds the write lock, so
+    uploads and status calls are answered during a long 'all' mode import
+    """
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode = WAL')
+
+
+class UploadRecord(models.Model):
+    """
+    A completed upload, remembered so that repeated deliveries of the same
+    file can be answered from the stored result
+    """
+    model_type = models.CharField(max_length=20, help_text="Type of data that was uploaded")
+    file_name = models.CharField(max_length=255, help_text="Name of the uploaded file")
+    content_hash = models.CharField(max_length=64, db_index=True, help_text="SHA-256 of the uploaded bytes")
+    size = models.BigIntegerField(help_text="Size of the uploaded file in bytes")
+    idempotency_key = models.CharField(
+        max_length=255,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text="Idempotency-Key header sent with the upload"
+    )
+    upsert = models.BooleanField(default=False, help_text="Whether the upload was loaded in upsert mode")
+    commit_mode = models.CharField(max_length=10, blank=True, help_text="Commit mode the upload was loaded with")
+    total_records = models.IntegerField(default=0, help_text="Rows read from the file")
+    reusable = models.BooleanField(
+        default=False,
+        help_text="Whether a byte-identical upload with the same options can be answered with this result"
+    )
+    extendable = models.BooleanField(
+        default=False,
+        help_text="Whether a later file starting with these bytes only needs its new rows loaded"
+    )
+    result = models.JSONField(help_text="Upload report returned for the import")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'upload_records'
+        ordering = ['-created_at']
+        verbose_name = 'Upload Record'
+        verbose_name_plural = 'Upload Records'
+    
+    def __str__(self):
+        return f"{self.file_name} ({self.model_type}, {self.content_hash[:12]})"
+
+
+class ResumableUpload(models.Model):
+    """
+    An upload session receiving a file in chunks, kept in the database so
+    that any worker process can take its chunks and finalize it
+    """
+    id = models.CharField(max_length=32, primary_key=True, editable=False)
+    model_type = models.CharField(max_length=20, help_text="Type of data being uploaded")
+    file_name = models.CharField(max_length=255, help_text="Name of the file being uploaded")
+    total_size = models.BigIntegerField(help_text="Size of the complete file in bytes")
+    chunk_size = models.IntegerField(help_text="Size of every chunk but the last in bytes")
+    options = models.JSONField(help_text="Loader options the import will run with")
+    path = models.CharField(max_length=1024, help_text="Pre-sized file the chunks are written into")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, help_text="When the last chunk arrived")
+    
+    class Meta:
+        db_table = 'resumable_uploads'
+        ordering = ['-created_at']
+        verbose_name = 'Resumable Upload'
+        verbose_name_plural = 'Resumable Uploads'
+    
+    def __str__(self):
+        return f"{self.file_name} ({self.model_type}, {self.id})"
+
+
+class ResumableChunk(models.Model):
+    """
+    A chunk of a resumable upload that has been written to its file
+    """
+    upload = models.ForeignKey(ResumableUpload, on_delete=models.CASCADE, related_name='chunks')
+    index = models.IntegerField(help_text="Position of the chunk in the file")
+    
+    class Meta:
+        db_table = 'resumable_chunks'
+        unique_together = ['upload', 'index']
+    
+    def __str__(self):
+        return f"{self.upload_id} chunk {self.index}"
+
+
+class ImportJobRecord(models.Model):
+    """
+    Last reported state of a background import job, so that its status can
+    be read from any worker process and after a restart
+    """
+    id = models.CharField(max_length=32, primary_key=True, editable=False)
+    status = models.CharField(max_length=20, help_text="queued, running, completed or failed")
+    report = models.JSONField(encoder=DjangoJSONEncoder, help_text="Job status report as of the last state change")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'import_jobs'
+        ordering = ['-created_at']
+        verbose_name = 'Import Job'
+        verbose_name_plural = 'Import Jobs'
+    
+    def __str__(self):
+        return f"{self.id} ({self.status})"
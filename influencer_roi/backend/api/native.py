@@ -0,0 +1,225 @@
+"""
+Native bulk write paths for uploads and local imports
+
+The loaders write through bulk_create, which is portable but compiles one
+multi-row INSERT per batch, preparing every value through the field. The
+native loaders below, used for uploads (see create_loader()) and by
+import_data, swap that for the fastest path of the configured database:
+executemany on a single prepared INSERT for SQLite and COPY into a staging
+table for PostgreSQL. import_data also sets bulk-load pragmas on its
+SQLite connection.
+"""
+import csv
+import io
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+from operator import attrgetter
+from uuid import UUID
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections, models
+from django.utils import timezone
+
+from .ingest import LOADERS
+
+# Connection pragmas used while bulk loading into SQLite
+SQLITE_LOAD_PRAGMAS = {
+    'synchronous': 'OFF',
+    'temp_store': 'MEMORY',
+    'cache_size': '-262144',
+}
+
+
+@contextmanager
+def bulk_load_session():
+    """Tune the current connection for bulk loading and restore it afterwards"""
+    if connection.vendor != 'sqlite':
+        yield
+        return
+
+    with connection.cursor() as cursor:
+        saved = {}
+        for name, value in SQLITE_LOAD_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name}')
+            saved[name] = cursor.fetchone()[0]
+            cursor.execute(f'PRAGMA {name} = {value}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for name, value in saved.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def insert_fields(model):
+    """Return the fields written on insert, leaving out auto-increment keys"""
+    return [
+        field for field in model._meta.concrete_fields
+        if not isinstance(field, models.AutoField)
+    ]
+
+
+# Field types whose values of this Python type the database adapter takes unchanged
+PLAIN_TYPES = {
+    'CharField': str,
+    'TextField': str,
+    'URLField': str,
+    'IntegerField': int,
+    'BigIntegerField': int,
+    'PositiveIntegerField': int,
+}
+
+
+def column_converter(field, db):
+    """
+    Return a function giving the database values of a column of attribute
+    values, skipping the field's per-value preparation where the result is
+    known: plain values pass through, dates and decimals go straight to the
+    backend's adapter and UUIDs become their hex form on databases without
+    a native UUID type
+    """
+    if field.is_relation:
+        field = field.target_field
+    prep = field.get_db_prep_save
+    internal_type = field.get_internal_type()
+    if internal_type in PLAIN_TYPES:
+        plain, convert = PLAIN_TYPES[internal_type], None
+    elif internal_type == 'DateField':
+        plain, convert = date, db.ops.adapt_datefield_value
+    elif internal_type == 'DecimalField':
+        adapt, digits, places = db.ops.adapt_decimalfield_value, field.max_digits, field.decimal_places
+        plain, convert = Decimal, lambda value: adapt(value, digits, places)
+    elif internal_type == 'UUIDField' and not db.features.has_native_uuid_field:
+        plain, convert = UUID, attrgetter('hex')
+    else:
+        return lambda values: [prep(value, db) for value in values]
+
+    def convert_column(values):
+        if set(map(type, values)) == {plain}:
+            return list(map(convert, values)) if convert else list(values)
+        return [
+            (convert(value) if convert else value) if value.__class__ is plain else prep(value, db)
+            for value in values
+        ]
+    return convert_column
+
+
+@lru_cache(maxsize=None)
+def row_type(model):
+    """
+    Return the namedtuple the native loaders build rows of `model` as, with
+    one attribute per inserted column, and the fields with callable defaults
+
+    Building a tuple skips the model's __init__ and its signals, and the rows
+    are prepared for the database a whole column at a time.
+    """
+    fields = insert_fields(model)
+    callable_defaults = [field for field in fields if field.has_default() and callable(field.default)]
+    defaults = [
+        None if field in callable_defaults or getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+        else field.get_default()
+        for field in fields
+    ]
+    row = namedtuple(f'{model.__name__}Row', [field.attname for field in fields], defaults=defaults)
+    return row, callable_defaults
+
+
+def prepare_rows(fields, rows):
+    """Return the database values of `rows`, with one auto_now timestamp per batch"""
+    db = connections[DEFAULT_DB_ALIAS]
+    now = timezone.now()
+    columns = []
+    for field, values in zip(fields, zip(*rows)):
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+            columns.append([field.get_db_prep_save(now, db)] * len(rows))
+        else:
+            columns.append(column_converter(field, db)(values))
+    return list(zip(*columns))
+
+
+class NativeLoaderMixin:
+    """
+    Loader mixin writing batches with executemany (SQLite) or COPY (PostgreSQL)
+
+    Rows are built as tuples of `row_type()` rather than model instances.
+    """
+
+    def make(self, **values):
+        row, callable_defaults = row_type(self.model)
+        for field in callable_defaults:
+            if field.attname not in values:
+                values[field.attname] = field.get_default()
+        return row(**values)
+
+    def conflict_clause(self):
+        """Return the ON CONFLICT clause of an upsert on the model's natural key"""
+        opts = self.model._meta
+        # Otherwise a conflicting row fails the batch, and write() reports it per row as with bulk_create
+        if not self.update_fields or not self.upsert:
+            return ''
+        quote = connection.ops.quote_name
+        key = ', '.join(quote(opts.get_field(field).column) for field in self.natural_key)
+        updates = ', '.join(
+            f'{quote(column)} = EXCLUDED.{quote(column)}'
+            for column in [opts.get_field(field).column for field in self.update_fields] + ['updated_at']
+        )
+        return f' ON CONFLICT ({key}) DO UPDATE SET {updates}'
+
+    def insert(self, objs):
+        if connection.vendor == 'sqlite':
+            self.insert_sqlite(objs)
+        elif connection.vendor == 'postgresql':
+            self.insert_postgresql(objs)
+        else:
+            super().insert([self.model(**obj._asdict()) for obj in objs])
+
+    def insert_sqlite(self, objs):
+        fields = insert_fields(self.model)
+        quote = connection.ops.quote_name
+        columns = ', '.join(quote(field.column) for field in fields)
+        placeholders = ', '.join(['%s'] * len(fields))
+        sql = f'INSERT INTO {quote(self.model._meta.db_table)} ({columns}) VALUES ({placeholders})'
+        with connection.cursor() as cursor:
+            cursor.executemany(sql + self.conflict_clause(), prepare_rows(fields, objs))
+
+    def insert_postgresql(self, objs):
+        fields = insert_fields(self.model)
+        quote = connection.ops.quote_name
+        table = quote(self.model._meta.db_table)
+        columns = ', '.join(quote(field.column) for field in fields)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in prepare_rows(fields, objs):
+            writer.writerow(['\\N' if value is None else value for value in row])
+        buffer.seek(0)
+
+        with connection.cursor() as cursor:
+            # Without a unique natural key rows can be copied straight into the table
+            target = table
+            if self.update_fields:
+                target = quote(f'{self.model._meta.db_table}_staging')
+                cursor.execute(f'CREATE TEMP TABLE IF NOT EXISTS {target} AS SELECT {columns} FROM {table} WITH NO DATA')
+                cursor.execute(f'TRUNCATE {target}')
+
+            copy_sql = f"COPY {target} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+            raw = cursor.cursor
+            if hasattr(raw, 'copy_expert'):
+                raw.copy_expert(copy_sql, buffer)
+            else:
+                with raw.copy(copy_sql) as copy:
+                    copy.write(buffer.getvalue())
+
+            if self.update_fields:
+                cursor.execute(
+                    f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {target}'
+                    + self.conflict_clause()
+                )
+
+
+NATIVE_LOADERS = {
+    model_type: type(f'Native{loader.__name__}', (NativeLoaderMixin, loader), {})
+    for model_type, loader in LOADERS.items()
+}
@@ -0,0 +1,192 @@
+"""
+Keyset (cursor) pagination for the model list endpoints
+
+A page is read with a range condition on the ordering columns that starts
+right after the last row of the previous page, instead of an OFFSET, so deep
+pages cost the same as the first. The ordering always ends with the primary
+key to make it total, and the default orderings are backed by matching
+indexes. ?count=false skips the COUNT(*) of the filtered rows. A ?page=
+number, from the page-number pagination this replaced, is rejected with
+400 rather than silently answered with the first page.
+"""
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+from uuid import UUID
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .ingest import parse_flag
+
+
+def encode_value(value):
+    """Return an ordering value as JSON, keeping full datetime precision"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    return value
+
+
+def resolve(obj, field):
+    """Read a possibly related ordering field such as influencer__name from an instance"""
+    for name in field.split('__'):
+        obj = getattr(obj, name)
+    return obj
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that pages on the values of every ordering column
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+    page_query_param = 'page'
+    page_query_message = 'Page numbers are not supported, follow the next and previous links (?cursor=) instead'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_query_param in request.query_params:
+            raise ParseError(self.page_query_message)
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.count = None
+        if parse_flag(request.query_params.get(self.count_query_param, 'true')):
+            self.count = queryset.count()
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['reverse'])
+        ordering = [self.invert(field) for field in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            try:
+                queryset = queryset.filter(self.after(ordering, cursor['position']))
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # Paging backwards means there is a page after this one, and vice versa
+        self.has_next = True if reverse else has_more
+        self.has_previous = has_more if reverse else cursor is not None
+        self.rows = rows
+        return rows
+
+    def get_page_size(self, request):
+        page_size = api_settings.PAGE_SIZE or 20
+        value = request.query_params.get(self.page_size_query_param)
+        if value:
+            try:
+                page_size = int(value)
+            except ValueError:
+                pass
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, request, queryset, view):
+        """The view's ordering, or the model's, ending with the primary key"""
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+        ordering = list(ordering or queryset.query.order_by or queryset.model._meta.ordering)
+
+        pk = queryset.model._meta.pk.name
+        if not any(field.lstrip('-') in (pk, 'pk') for field in ordering):
+            # Same direction as the last column, so one index scan serves the whole ordering
+            descending = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append(f"{'-' if descending else ''}{pk}")
+        return ordering
+
+    def invert(self, field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def after(self, ordering, position):
+        """Match the rows that come after `position` in `ordering`"""
+        clauses = []
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            clauses.append(equal & Q(**{f'{name}__{lookup}': value}))
+            equal &= Q(**{name: value})
+
+        # Bound the leading column on its own as well, so its index is range scanned
+        first = ordering[0]
+        lookup = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{lookup}': position[0]}) & reduce(or_, clauses)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            position = cursor['p']
+            valid = cursor['o'] == self.ordering and len(position) == len(self.ordering)
+        except (TypeError, KeyError, ValueError):
+            valid = False
+        if not valid:
+            raise NotFound(self.invalid_cursor_message)
+        return {'position': position, 'reverse': bool(cursor.get('r'))}
+
+    def encode_cursor(self, row, reverse):
+        cursor = {
+            'o': self.ordering,
+            'p': [encode_value(resolve(row, field.lstrip('-'))) for field in self.ordering],
+        }
+        if reverse:
+            cursor['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.rows:
+            return None
+        return self.encode_cursor(self.rows[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.rows:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.rows[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        response = {}
+        if self.count is not None:
+            response['count'] = self.count
+        response.update({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
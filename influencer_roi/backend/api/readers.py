@@ -0,0 +1,275 @@
+"""
+Streaming row readers for bulk uploads
+
+Text uploads are consumed chunk by chunk through an incremental decoder,
+so only the current chunk and the row being parsed are held in memory.
+Columnar uploads (Parquet, Arrow IPC) are read one record batch at a time
+and yield typed values, so dates and numbers never go through strings.
+Text uploads may be gzip, bzip2 or zstd compressed and are decompressed as
+a stream while they are parsed.
+"""
+import bz2
+import codecs
+import csv
+import gzip
+import json
+
+READ_CHUNK_SIZE = 64 * 1024
+RECORD_BATCH_SIZE = 8192
+
+
+def iter_chunks(file, chunk_size=READ_CHUNK_SIZE):
+    """Read a binary file object in fixed-size chunks"""
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def iter_text(chunks, encoding='utf-8'):
+    """Decode an iterable of byte chunks into text chunks"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
+def iter_lines(chunks, encoding='utf-8'):
+    """Split decoded chunks into lines, keeping the line endings"""
+    pending = ''
+    for text in iter_text(chunks, encoding):
+        pending += text
+        lines = pending.split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    if pending:
+        yield pending
+
+
+def read_csv(file):
+    """Yield CSV rows as dictionaries with whitespace stripped from values"""
+    for row in csv.DictReader(iter_lines(iter_chunks(file))):
+        for key, value in row.items():
+            if isinstance(value, str):
+                row[key] = value.strip()
+        yield row
+
+
+def read_json(file):
+    """
+    Yield the objects of a JSON array or of a newline-delimited JSON stream
+
+    Objects are decoded one at a time with raw_decode; more input is pulled
+    in only when the buffered text does not yet hold a complete object.
+    """
+    decoder = json.JSONDecoder()
+    text = iter_text(iter_chunks(file))
+    buffer = ''
+    position = 0
+    in_array = None
+    exhausted = False
+
+    def fill():
+        nonlocal buffer, position, exhausted
+        try:
+            buffer = buffer[position:] + next(text)
+        except StopIteration:
+            buffer = buffer[position:]
+            exhausted = True
+        position = 0
+
+    def skip_whitespace():
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer) or exhausted:
+                return
+            fill()
+
+    while True:
+        skip_whitespace()
+        if position >= len(buffer):
+            if in_array:
+                raise ValueError("Unexpected end of JSON array")
+            return
+
+        char = buffer[position]
+        if in_array is None:
+            in_array = char == '['
+            if in_array:
+                position += 1
+                continue
+        elif in_array:
+            if char == ']':
+                position += 1
+                skip_whitespace()
+                if position < len(buffer):
+                    raise ValueError("Unexpected data after JSON array")
+                return
+            if char == ',':
+                position += 1
+                continue
+
+        while True:
+            try:
+                obj, position = decoder.raw_decode(buffer, position)
+                break
+            except json.JSONDecodeError:
+                if exhausted:
+                    raise
+                fill()
+        yield obj
+
+
+def import_pyarrow():
+    """Import pyarrow, which is only needed for columnar uploads"""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError('Parquet and Arrow uploads require the pyarrow package')
+    return pyarrow
+
+
+def iter_record_batches(batches):
+    """Yield the rows of Arrow record batches, leaving out null values"""
+    for batch in batches:
+        for row in batch.to_pylist():
+            yield {key: value for key, value in row.items() if value is not None}
+
+
+def read_parquet(file):
+    """Yield the rows of a Parquet file one record batch at a time"""
+    pyarrow = import_pyarrow()
+    parquet_file = pyarrow.parquet.ParquetFile(file)
+    yield from iter_record_batches(parquet_file.iter_batches(batch_size=RECORD_BATCH_SIZE))
+
+
+def read_arrow(file):
+    """Yield the rows of an Arrow IPC file or stream one record batch at a time"""
+    pyarrow = import_pyarrow()
+    try:
+        reader = pyarrow.ipc.open_file(file)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    except pyarrow.ArrowInvalid:
+        file.seek(0)
+        batches = pyarrow.ipc.open_stream(file)
+    yield from iter_record_batches(batches)
+
+
+def open_gzip(file):
+    return gzip.GzipFile(fileobj=file, mode='rb')
+
+
+def open_bz2(file):
+    return bz2.BZ2File(file, mode='rb')
+
+
+def open_zstd(file):
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError('Zstandard compressed uploads require the zstandard package')
+    return zstandard.ZstdDecompressor().stream_reader(file)
+
+
+UNSUPPORTED_FORMAT = 'File must be CSV, JSON, Parquet or Arrow format (CSV/JSON may be .gz, .bz2 or .zst compressed)'
+
+DECOMPRESSORS = {
+    '.gz': open_gzip,
+    '.bz2': open_bz2,
+    '.zst': open_zstd,
+    '.zstd': open_zstd,
+}
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+    '.ndjson': read_json,
+    '.jsonl': read_json,
+    '.parquet': read_parquet,
+    '.arrow': read_arrow,
+    '.arrows': read_arrow,
+    '.feather': read_arrow,
+}
+
+
+# Parquet and Arrow need random access and are compressed internally
+COLUMNAR_READERS = (read_parquet, read_arrow)
+
+
+def split_compression(filename):
+    """Split a file name into its name without a compression suffix and the decompressor"""
+    name = filename.lower()
+    for extension, opener in DECOMPRESSORS.items():
+        if name.endswith(extension):
+            return name[:-len(extension)], opener
+    return name, None
+
+
+def find_reader(name):
+    """Return the reader for an uncompressed file name, or None"""
+    for extension, reader in READERS.items():
+        if name.endswith(extension):
+            return reader
+    return None
+
+
+def get_reader(filename):
+    """Return the reader for a file name, or None for unsupported formats"""
+    name, decompress = split_compression(filename)
+    reader = find_reader(name)
+    if reader is None:
+        return None
+
+    if decompress is None:
+        return reader
+    if reader in COLUMNAR_READERS:
+        return None
+
+    def read_compressed(file):
+        return reader(decompress(file))
+
+    return read_compressed
+
+
+class SplicedFile:
+    """
+    Binary file that reads `head` first and then the rest of `file`
+    """
+
+    def __init__(self, head, file):
+        self.head = head
+        self.file = file
+
+    def read(self, size=-1):
+        if self.head:
+            data = self.head if size < 0 else self.head[:size]
+            self.head = self.head[len(data):]
+            return data
+        return self.file.read(size)
+
+
+def open_tail(file, filename, offset):
+    """Return the rows of a line-based file from byte `offset`, keeping a CSV header"""
+    head = b''
+    if find_reader(split_compression(filename)[0]) is read_csv:
+        head = file.readline()
+    file.seek(offset)
+    return SplicedFile(head, file)
+
+
+def read_rows(file):
+    """Stream the rows of an uploaded file"""
+    reader = get_reader(file.name)
+    if reader is None:
+        raise ValueError(UNSUPPORTED_FORMAT)
+    return reader(file)
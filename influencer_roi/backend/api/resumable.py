@@ -0,0 +1,224 @@
+"""
+Resumable chunked uploads
+
+A client creates an upload session, PUTs the file as numbered chunks in any
+order (re-sending any chunk that failed) and then finalizes the session,
+which queues a background import of the assembled file. Chunks are written
+straight to their offset in a pre-sized file on local disk, so nothing is
+buffered in memory and a dropped connection only costs the chunk in flight.
+
+Sessions and their received chunks are stored in the database, so chunks
+and the finalize call may reach any worker process sharing UPLOAD_JOB_DIR,
+and sessions survive a restart.
+"""
+import math
+import os
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .archive import ARCHIVE, is_archive
+from .ingest import LOADERS, clean_options
+from .jobs import defer_write, queue_import
+from .models import ResumableChunk, ResumableUpload
+from .readers import UNSUPPORTED_FORMAT, get_reader, iter_chunks
+
+
+def get_chunk_size(value=None):
+    """Resolve the chunk size from a request value or the UPLOAD_CHUNK_SIZE setting"""
+    default = getattr(settings, 'UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+    if value in (None, ''):
+        return default
+    try:
+        chunk_size = int(value)
+    except (TypeError, ValueError):
+        raise Exception(f"Invalid chunk_size: '{value}'")
+    if chunk_size < 1:
+        raise Exception(f"Invalid chunk_size: '{value}'")
+    return min(chunk_size, getattr(settings, 'UPLOAD_MAX_CHUNK_SIZE', 64 * 1024 * 1024))
+
+
+class UploadSession:
+    """
+    A file being received in chunks
+    """
+
+    def __init__(self, record):
+        self.record = record
+        self.id = record.id
+        self.model_type = record.model_type
+        self.file_name = record.file_name
+        self.total_size = record.total_size
+        self.chunk_size = record.chunk_size
+        self.total_chunks = max(math.ceil(record.total_size / record.chunk_size), 1)
+        self.options = record.options
+        self.path = record.path
+
+    @classmethod
+    def create(cls, model_type, file_name, total_size, chunk_size, options):
+        """Pre-size the file the chunks are written into and record the session"""
+        upload_dir = get_upload_dir()
+        os.makedirs(upload_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix='session-', dir=upload_dir)
+        with os.fdopen(fd, 'wb') as f:
+            f.truncate(total_size)
+        record = ResumableUpload.objects.create(
+            id=uuid.uuid4().hex,
+            model_type=model_type,
+            file_name=file_name,
+            total_size=total_size,
+            chunk_size=chunk_size,
+            options=options,
+            path=path,
+        )
+        return cls(record)
+
+    def chunk_length(self, index):
+        return min(self.chunk_size, self.total_size - index * self.chunk_size)
+
+    def write_chunk(self, index, stream):
+        """Write one chunk at its offset; a chunk may be sent again to retry it"""
+        if not 0 <= index < self.total_chunks:
+            raise Exception(f"Invalid chunk index {index}. Must be between 0 and {self.total_chunks - 1}")
+
+        expected = self.chunk_length(index)
+        written = 0
+        try:
+            f = open(self.path, 'r+b')
+        except FileNotFoundError:
+            raise Exception(f"Upload session {self.id} was already finalized")
+        with f:
+            f.seek(index * self.chunk_size)
+            for piece in iter_chunks(stream) if stream is not None else ():
+                written += len(piece)
+                if written > expected:
+                    break
+                f.write(piece)
+        if written != expected:
+            raise Exception(f"Chunk {index} must be {expected} bytes")
+
+        if not ResumableUpload.objects.filter(id=self.id).update(updated_at=timezone.now()):
+            raise Exception(f"Upload session {self.id} was already finalized")
+        ResumableChunk.objects.bulk_create([ResumableChunk(upload_id=self.id, index=index)], ignore_conflicts=True)
+
+    def check_complete(self):
+        if not os.path.exists(self.path):
+            raise Exception(f"Upload session {self.id} was already finalized")
+        missing = self.missing_chunks()
+        if missing:
+            raise Exception(f"{len(missing)} chunks have not been received yet: {missing[:20]}")
+
+    def received_chunks(self):
+        return set(ResumableChunk.objects.filter(upload_id=self.id).values_list('index', flat=True))
+
+    def missing_chunks(self, received=None):
+        if received is None:
+            received = self.received_chunks()
+        return [index for index in range(self.total_chunks) if index not in received]
+
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def to_dict(self):
+        """Return the session status report"""
+        received = self.received_chunks()
+        bytes_received = sum(self.chunk_length(index) for index in received)
+        updated_at = ResumableUpload.objects.filter(id=self.id).values_list('updated_at', flat=True).first()
+        return {
+            'id': self.id,
+            'model_type': self.model_type,
+            'file_name': self.file_name,
+            'total_size': self.total_size,
+            'chunk_size': self.chunk_size,
+            'total_chunks': self.total_chunks,
+            'received_chunks': len(received),
+            'missing_chunks': self.missing_chunks(received),
+            'bytes_received': bytes_received,
+            'progress': round(bytes_received / self.total_size, 4) if self.total_size else 1,
+            'created_at': self.record.created_at,
+            'updated_at': updated_at or self.record.updated_at,
+        }
+
+
+def get_upload_dir():
+    return str(getattr(settings, 'UPLOAD_JOB_DIR', None) or tempfile.gettempdir())
+
+
+def create_session(model_type, file_name, total_size, chunk_size=None, **options):
+    """Validate an upload's metadata and open a session for its chunks"""
+    if not file_name:
+        raise Exception("file_name is required")
+    if is_archive(file_name):
+        model_type = ARCHIVE
+    if model_type not in LOADERS and model_type != ARCHIVE:
+        raise Exception(f"Invalid model_type. Must be one of: {list(LOADERS.keys())}")
+    if model_type != ARCHIVE and get_reader(file_name) is None:
+        raise Exception(UNSUPPORTED_FORMAT)
+    try:
+        total_size = int(total_size)
+    except (TypeError, ValueError):
+        raise Exception(f"Invalid total_size: '{total_size}'")
+    if total_size < 1:
+        raise Exception(f"Invalid total_size: '{total_size}'")
+
+    options = clean_options(model_type, **options)
+    prune_sessions()
+    return UploadSession.create(model_type, file_name, total_size, get_chunk_size(chunk_size), options)
+
+
+def get_session(session_id):
+    record = ResumableUpload.objects.filter(id=session_id).first()
+    return UploadSession(record) if record else None
+
+
+def finalize_session(session, fingerprint=None):
+    """Queue the import of a fully received session, returning the job"""
+    session.check_complete()
+
+    # Moving the session file claims it, so only one finalize call queues the
+    # import; the session record is deleted off the request thread
+    path = os.path.join(os.path.dirname(session.path), f'upload-{session.id}')
+    try:
+        os.rename(session.path, path)
+    except FileNotFoundError:
+        raise Exception(f"Upload session {session.id} was already finalized")
+    defer_write(ResumableUpload.objects.filter(id=session.id).delete)
+    return queue_import(session.model_type, session.file_name, path, session.options, fingerprint)
+
+
+def discard_session(session):
+    ResumableUpload.objects.filter(id=session.id).delete()
+    session.discard()
+
+
+def prune_sessions():
+    """
+    Drop sessions that have not received a chunk within UPLOAD_SESSION_TTL
+    seconds, and session files that no session refers to any more
+    """
+    ttl = getattr(settings, 'UPLOAD_SESSION_TTL', 24 * 60 * 60)
+    expired = ResumableUpload.objects.filter(updated_at__lt=timezone.now() - timedelta(seconds=ttl))
+    for record in expired:
+        discard_session(UploadSession(record))
+
+    # Left behind by a process that stopped before finalizing or importing them
+    upload_dir = get_upload_dir()
+    if not os.path.isdir(upload_dir):
+        return
+    live = set(ResumableUpload.objects.values_list('path', flat=True))
+    cutoff = time.time() - ttl
+    for entry in os.scandir(upload_dir):
+        if not entry.name.startswith('session-') or entry.path in live:
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
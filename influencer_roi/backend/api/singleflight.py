@@ -0,0 +1,81 @@
+"""
+Single-flight execution of identical computations
+
+Concurrent callers with the same key share one computation: the first runs
+it and the others wait for its result instead of repeating the work. With a
+shared cache, a lock entry extends this to the workers of other processes,
+which wait for the result to appear in the cache.
+"""
+import threading
+import time
+
+# How often a worker waiting on another process checks for the result
+POLL_INTERVAL = 0.05
+
+
+class Flight:
+    """
+    A computation in progress and, once done, its result
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time within this process
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, compute, timeout=None):
+        """
+        Return (result, shared): the result of `compute()`, or of the identical
+        computation already in flight. A caller whose leader failed, returned
+        None or took longer than `timeout` seconds computes the result itself.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+
+        if not leader:
+            if flight.done.wait(timeout) and flight.result is not None:
+                return flight.result, True
+            return compute(), False
+
+        try:
+            flight.result = compute()
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+
+
+def run_locked(cache, key, compute, timeout):
+    """
+    Compute the value cached under `key` in one process at a time: if
+    another process holds the lock, wait up to `timeout` seconds for it to
+    store the value before computing it here
+    """
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, timeout=timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            value = cache.get(key)
+            if value is not None:
+                return value
+            if not cache.has_key(lock_key):
+                break
+
+    try:
+        return compute()
+    finally:
+        cache.delete(lock_key)
@@ -0,0 +1,205 @@
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from influencers.models import Influencer, Post
+from payouts.models import Payout
+from tracking.models import TrackingData
+
+EXAMPLE_DATA = settings.BASE_DIR.parent / 'example_data'
+
+
+def example_file(name):
+    return SimpleUploadedFile(name, (EXAMPLE_DATA / name).read_bytes())
+
+
+def upload(client, model_type, name, content, **data):
+    """Upload `content` as the file `name` and return the response"""
+    return client.post('/api/upload/', {
+        'model_type': model_type,
+        'file': SimpleUploadedFile(name, content),
+        **data
+    })
+
+
+class UpsertTests(TestCase):
+    """An upsert re-delivery inserts new rows, updates changed ones and leaves the rest alone"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.post('/api/upload/', {'model_type': 'influencers', 'file': example_file('influencers.csv')})
+        self.client.post('/api/upload/', {'model_type': 'posts', 'file': example_file('posts.csv')})
+
+    def test_counts(self):
+        header, *rows = (EXAMPLE_DATA / 'posts.csv').read_text().splitlines()
+        changed = [row.rsplit(',', 3)[0] + ',1,2,3' for row in rows[:5]]
+        added = [
+            'Sarah Johnson,instagram,2025-01-01,,New post,500,50,5',
+            'Mike Chen,youtube,2025-01-02,,New video,800,80,8',
+            'Mike Chen,youtube,2025-01-03,,Another video,900,90,9',
+        ]
+        content = '\n'.join([header, *changed, *rows[5:], *added]).encode()
+
+        response = upload(self.client, 'posts', 'posts.csv', content, upsert='1')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['inserted_count'], 3)
+        self.assertEqual(response.data['updated_count'], 5)
+        self.assertEqual(response.data['unchanged_count'], 50)
+        self.assertEqual(response.data['errors'], [])
+        self.assertEqual(Post.objects.count(), 58)
+        self.assertEqual(Post.objects.filter(reach=1, likes=2, comments=3).count(), 5)
+
+        # Delivering the same file again changes nothing
+        response = upload(self.client, 'posts', 'posts.csv', content, upsert='1', force='1')
+        self.assertEqual(response.data['inserted_count'], 0)
+        self.assertEqual(response.data['updated_count'], 0)
+        self.assertEqual(response.data['unchanged_count'], 58)
+
+
+class IdempotencyTests(TestCase):
+    """Repeated and extended deliveries are answered from earlier error-free uploads"""
+
+    def setUp(self):
+        self.client = APIClient()
+        # Ends with a newline, so a later delivery can extend it
+        self.tracking = (EXAMPLE_DATA / 'tracking.csv').read_bytes().rstrip(b'\n') + b'\n'
+
+    def load_influencers(self):
+        self.client.post('/api/upload/', {'model_type': 'influencers', 'file': example_file('influencers.csv')})
+
+    def test_identical_upload_short_circuits(self):
+        self.load_influencers()
+        first = upload(self.client, 'tracking', 'tracking.csv', self.tracking)
+        self.assertEqual(first.data['created_count'], 55)
+
+        # Answered from the stored report: only the two upload record lookups run
+        with self.assertNumQueries(2):
+            repeat = upload(self.client, 'tracking', 'tracking.csv', self.tracking)
+        self.assertEqual(repeat.status_code, 200)
+        self.assertTrue(repeat.data['duplicate'])
+        self.assertEqual(repeat.data['created_count'], 55)
+        self.assertEqual(TrackingData.objects.count(), 55)
+
+    def test_extended_upload_loads_new_rows(self):
+        self.load_influencers()
+        upload(self.client, 'tracking', 'tracking.csv', self.tracking)
+        extended = self.tracking + (
+            b'Shopify,Spring Campaign,Sarah Johnson,user_new_1,Product A,2024-05-01,2,80.00,Nike\n'
+            b'Shopify,Spring Campaign,Mike Chen,user_new_2,Product B,2024-05-02,1,40.00,Adidas\n'
+        )
+
+        response = upload(self.client, 'tracking', 'tracking.csv', extended)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['skipped_count'], 55)
+        self.assertEqual(response.data['total_records'], 57)
+        self.assertEqual(response.data['created_count'], 2)
+        self.assertEqual(TrackingData.objects.count(), 57)
+
+    def test_upload_with_errors_is_not_reused(self):
+        # Every row names an influencer that is not loaded yet
+        failed = upload(self.client, 'tracking', 'tracking.csv', self.tracking)
+        self.assertEqual(failed.data['created_count'], 0)
+        self.assertEqual(len(failed.data['errors']), 55)
+
+        self.load_influencers()
+        response = upload(self.client, 'tracking', 'tracking.csv', self.tracking)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('duplicate', response.data)
+        self.assertNotIn('skipped_count', response.data)
+        self.assertEqual(response.data['created_count'], 55)
+
+
+class DryRunTests(TestCase):
+    """Dry runs report what the loaders would do without writing anything"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.post('/api/upload/', {'model_type': 'influencers', 'file': example_file('influencers.csv')})
+
+    def test_choice_warnings(self):
+        response = self.client.post('/api/upload/', {
+            'model_type': 'payouts',
+            'dry_run': '1',
+            'file': example_file('payouts.csv')
+        })
+        report = response.data
+        # engagement, click and sale are not in BASIS_CHOICES but are stored as sent
+        self.assertEqual(report['valid_count'], 55)
+        self.assertEqual(report['invalid_count'], 0)
+        self.assertEqual(report['warning_count'], 38)
+        self.assertEqual(report['warning_summary'], {'invalid_choice': 38})
+        self.assertEqual(
+            report['warnings'][0],
+            "Row 2: Invalid basis 'engagement'. Expected one of: post, order, revenue, flat"
+        )
+        self.assertEqual(Payout.objects.count(), 0)
+
+        response = self.client.post('/api/upload/', {'model_type': 'payouts', 'file': example_file('payouts.csv')})
+        self.assertEqual(response.data['created_count'], 55)
+
+
+class KeysetPaginationTests(TestCase):
+    """List pages follow each other by cursor without skipping or repeating rows"""
+
+    def setUp(self):
+        self.client = APIClient()
+        # Many influencers share a follower count, the first ordering column
+        for i in range(23):
+            self.create(f'Influencer {i}', 1000 * (i % 3))
+
+    def create(self, name, follower_count):
+        return Influencer.objects.create(
+            name=name,
+            category='Tech',
+            gender='other',
+            follower_count=follower_count,
+            platform='youtube'
+        )
+
+    def expected(self):
+        return [str(pk) for pk in Influencer.objects.order_by('-follower_count', '-id').values_list('id', flat=True)]
+
+    def walk(self, url, link='next'):
+        """Follow `link` from `url`, returning the ids of every page in the order visited"""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([row['id'] for row in response.data['results']])
+            url = response.data[link]
+        return pages
+
+    def test_next_and_previous(self):
+        pages = self.walk('/api/influencers/?page_size=4')
+        self.assertEqual([len(page) for page in pages], [4, 4, 4, 4, 4, 3])
+        self.assertEqual(sum(pages, []), self.expected())
+
+        # Back from the last page to the first, through the same pages
+        last = self.client.get('/api/influencers/?page_size=4')
+        for _ in range(5):
+            last = self.client.get(last.data['next'])
+        self.assertIsNone(last.data['next'])
+        back = self.walk(last.data['previous'], link='previous')
+        self.assertEqual(back, pages[-2::-1])
+
+    def test_rows_inserted_between_pages(self):
+        response = self.client.get('/api/influencers/?page_size=5')
+        seen = [row['id'] for row in response.data['results']]
+        position = Influencer.objects.get(id=seen[-1])
+
+        # One row sorts before the page just read, one after it
+        passed = self.create('Passed', position.follower_count + 500)
+        ahead = self.create('Ahead', position.follower_count - 500)
+        for page in self.walk(response.data['next']):
+            seen += page
+
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertNotIn(str(passed.id), seen)
+        self.assertIn(str(ahead.id), seen)
+        self.assertEqual(seen, [pk for pk in self.expected() if pk != str(passed.id)])
+
+    def test_page_number_rejected(self):
+        response = self.client.get('/api/influencers/', {'page': 2})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.data['detail'])
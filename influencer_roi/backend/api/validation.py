@@ -0,0 +1,349 @@
+"""
+Vectorized dry-run validation for bulk uploads
+
+A dry run loads the whole file into typed pandas columns and applies the
+loaders' rules one column at a time - dates, numbers, influencer names and
+duplicate natural keys - without writing anything. Choice columns are
+stored as sent, like the loaders do, so values outside the model's choices
+are reported as warnings that do not make a row invalid.
+"""
+import zipfile
+
+from django.conf import settings
+
+from influencers.models import Influencer, Post
+from tracking.models import TrackingData
+from payouts.models import Payout
+from .ingest import InfluencerLoader, PayoutLoader, PostLoader
+from .readers import (
+    COLUMNAR_READERS, UNSUPPORTED_FORMAT, find_reader, import_pyarrow,
+    read_arrow, read_csv, split_compression
+)
+
+
+def import_pandas():
+    """Import pandas, which is only needed for dry runs"""
+    try:
+        import pandas
+    except ImportError:
+        raise ValueError('Dry-run validation requires the pandas package')
+    return pandas
+
+
+def read_frame(file, filename):
+    """Load an uploaded file into a DataFrame"""
+    pd = import_pandas()
+    name, decompress = split_compression(filename)
+    reader = find_reader(name)
+    if reader is None or (decompress and reader in COLUMNAR_READERS):
+        raise ValueError(UNSUPPORTED_FORMAT)
+    if decompress:
+        file = decompress(file)
+
+    if reader is read_csv:
+        return pd.read_csv(file, dtype=str, keep_default_na=False, encoding='utf-8')
+
+    if reader in COLUMNAR_READERS:
+        pyarrow = import_pyarrow()
+        if reader is read_arrow:
+            try:
+                table = pyarrow.ipc.open_file(file).read_all()
+            except pyarrow.ArrowInvalid:
+                file.seek(0)
+                table = pyarrow.ipc.open_stream(file).read_all()
+        else:
+            table = pyarrow.parquet.read_table(file)
+        return table.to_pandas(date_as_object=False)
+
+    return pd.DataFrame.from_records(list(reader(file)))
+
+
+class FrameValidator:
+    """
+    Runs column checks over a DataFrame and collects the failing rows
+    """
+
+    def __init__(self, frame, model, names):
+        self.pd = import_pandas()
+        self.frame = frame
+        self.model = model
+        self.names = names
+        self.rows = self.pd.Series(range(1, len(frame) + 1), index=frame.index)
+        self.keys = {}
+        self.file_errors = []
+        self.row_errors = []
+        self.row_warnings = []
+
+    def column(self, column, required=True):
+        """Return a column, recording a file error if a required one is missing"""
+        if column in self.frame:
+            return self.frame[column]
+        if required:
+            self.file_errors.append(f"Missing required column '{column}'")
+        return None
+
+    def text(self, values):
+        """Return a column as stripped strings, using Arrow-backed kernels when available"""
+        try:
+            return values.astype('string[pyarrow]').str.strip()
+        except ImportError:
+            return values.astype('string').str.strip()
+
+    def add(self, mask, message, check, warning=False):
+        """Record an error, or a warning, for every row selected by `mask`"""
+        mask = mask.fillna(False).astype(bool)
+        if not mask.any():
+            return
+        if not isinstance(message, str):
+            message = message[mask].astype(str)
+        found = self.row_warnings if warning else self.row_errors
+        found.append(self.pd.DataFrame({
+            'row': self.rows[mask],
+            'message': message,
+            'check': check,
+        }))
+
+    def required(self, column):
+        values = self.column(column)
+        if values is None:
+            return
+        self.add(values.isna(), f"{column} is required", 'required')
+        self.keys[column] = self.text(values)
+
+    def date(self, column, label):
+        values = self.column(column)
+        if values is None:
+            return
+        pd = self.pd
+        if pd.api.types.is_datetime64_any_dtype(values):
+            parsed = values
+            self.add(values.isna(), f"{label} date is required", 'invalid_date')
+        else:
+            text = self.text(values)
+            parsed = pd.to_datetime(text, format='%Y-%m-%d', errors='coerce')
+            blank = text.isna() | (text == '')
+            self.add(blank, f"{label} date is required", 'invalid_date')
+            self.add(
+                parsed.isna() & ~blank,
+                "Invalid date format: '" + text + "'. Must be YYYY-MM-DD",
+                'invalid_date'
+            )
+        self.keys[column] = parsed.dt.normalize()
+
+    def integer(self, column):
+        values = self.column(column, required=False)
+        if values is None or self.pd.api.types.is_numeric_dtype(values):
+            return
+        text = self.text(values)
+        self.add(
+            text.notna() & ~text.str.fullmatch(r'[+-]?\d+').fillna(False),
+            "Invalid integer for " + column + ": '" + text + "'",
+            'invalid_integer'
+        )
+
+    def amount(self, column):
+        values = self.column(column, required=False)
+        if values is None:
+            return
+        pd = self.pd
+        if pd.api.types.is_numeric_dtype(values):
+            numbers = values
+        else:
+            text = self.text(values)
+            numbers = pd.to_numeric(text, errors='coerce')
+            self.add(
+                text.notna() & numbers.isna(),
+                "Invalid amount for " + column + ": '" + text + "'",
+                'invalid_amount'
+            )
+
+        field = self.model._meta.get_field(column)
+        digits = field.max_digits - field.decimal_places
+        self.add(
+            numbers.astype(float).abs() >= 10 ** digits,
+            f"{column} must have no more than {digits} digits before the decimal point",
+            'invalid_amount'
+        )
+
+    def choices(self, loader):
+        """
+        Key the choice columns of `loader` as it stores them: as sent, or its
+        default when missing, warning about values outside the model's choices
+        """
+        for column, default in loader.choice_defaults.items():
+            values = self.column(column, required=False)
+            if values is None:
+                self.keys[column] = self.pd.Series(default, index=self.frame.index)
+                continue
+            values = values.astype('string')
+            allowed = [value for value, _ in self.model._meta.get_field(column).choices]
+            self.add(
+                values.notna() & ~values.isin(allowed),
+                "Invalid " + column + " '" + values.fillna('') + "'. Expected one of: " + ', '.join(allowed),
+                'invalid_choice',
+                warning=True
+            )
+            self.keys[column] = values.fillna(default)
+
+    def influencer(self, column='influencer_name'):
+        values = self.column(column)
+        if values is None:
+            return
+        text = self.text(values)
+        self.add(
+            ~text.isin(self.names),
+            "Influencer '" + text.fillna('') + "' not found",
+            'unknown_influencer'
+        )
+        self.keys[column] = text
+
+    def duplicates(self, columns):
+        """Flag rows repeating the natural key of an earlier row in the file"""
+        if not all(column in self.keys for column in columns):
+            return
+        keys = self.pd.DataFrame({column: self.keys[column] for column in columns})
+        repeated = keys.duplicated(keep='first')
+        if not repeated.any():
+            return
+        group = keys.groupby(columns, sort=False, dropna=False).ngroup()
+        first_row = self.rows.groupby(group).transform('first')
+        self.add(repeated, "Duplicate of row " + first_row.astype(str), 'duplicate_key')
+
+    def collect(self, found):
+        """Concatenate recorded row errors or warnings in row order"""
+        if found:
+            return self.pd.concat(found).sort_values('row', kind='stable')
+        return self.pd.DataFrame({'row': [], 'message': [], 'check': []})
+
+    def result(self):
+        """Return the dry-run report"""
+        total_records = len(self.frame)
+        errors = self.collect(self.row_errors)
+        warnings = self.collect(self.row_warnings)
+
+        invalid_count = total_records if self.file_errors else errors['row'].nunique()
+        valid_count = total_records - invalid_count
+        error_summary = {check: int(count) for check, count in errors.groupby('check').size().items()}
+        if self.file_errors:
+            error_summary['missing_column'] = len(self.file_errors)
+
+        limit = getattr(settings, 'UPLOAD_DRY_RUN_MAX_ERRORS', 1000)
+        shown = errors.head(max(limit - len(self.file_errors), 0))
+        messages = self.file_errors + [
+            f"Row {row}: {message}" for row, message in zip(shown['row'], shown['message'])
+        ]
+        warning_messages = [
+            f"Row {row}: {message}" for row, message in zip(warnings['row'].head(limit), warnings['message'])
+        ]
+        return {
+            'message': f'Validated {total_records} records: {valid_count} valid, {invalid_count} invalid (dry run, nothing was written)',
+            'dry_run': True,
+            'total_records': total_records,
+            'valid_count': valid_count,
+            'invalid_count': invalid_count,
+            'error_count': len(self.file_errors) + len(errors),
+            'error_summary': error_summary,
+            'errors': messages[:limit],
+            'warning_count': len(warnings),
+            'warning_summary': {check: int(count) for check, count in warnings.groupby('check').size().items()},
+            'warnings': warning_messages,
+        }
+
+
+def validate_influencers(check):
+    check.required('name')
+    check.integer('follower_count')
+    check.choices(InfluencerLoader)
+    check.duplicates(['name'])
+
+
+def validate_posts(check):
+    check.influencer()
+    check.date('date', 'Post')
+    check.choices(PostLoader)
+    for column in ('reach', 'likes', 'comments'):
+        check.integer(column)
+    check.duplicates(['influencer_name', 'date', 'platform'])
+
+
+def validate_tracking(check):
+    check.influencer()
+    check.required('user_id')
+    check.required('product')
+    check.date('date', 'Tracking')
+    check.integer('orders')
+    check.amount('revenue')
+    check.duplicates(['user_id', 'date', 'product', 'influencer_name'])
+
+
+def validate_payouts(check):
+    check.influencer()
+    check.date('payout_date', 'Payout')
+    check.choices(PayoutLoader)
+    check.amount('rate')
+    check.integer('orders')
+    check.amount('total_payout')
+    check.duplicates(['influencer_name', 'payout_date', 'basis'])
+
+
+VALIDATORS = {
+    'influencers': (Influencer, validate_influencers),
+    'posts': (Post, validate_posts),
+    'tracking': (TrackingData, validate_tracking),
+    'payouts': (Payout, validate_payouts),
+}
+
+
+def validate_frame(model_type, frame, names):
+    model, validate = VALIDATORS[model_type]
+    check = FrameValidator(frame, model, names)
+    validate(check)
+    return check.result()
+
+
+def validate_archive(file):
+    """Dry-run every member of an archive, counting influencers it would add as known"""
+    from .archive import find_members
+
+    names = set(Influencer.objects.values_list('name', flat=True))
+    files = {}
+    with zipfile.ZipFile(file) as archive:
+        for model_type, name in find_members(archive).items():
+            frame = read_frame(archive.open(name), name)
+            if model_type == 'influencers' and 'name' in frame:
+                names.update(frame['name'].dropna().astype(str).str.strip())
+            files[model_type] = {'file': name, **validate_frame(model_type, frame, list(names))}
+
+    total_records = sum(report['total_records'] for report in files.values())
+    invalid_count = sum(report['invalid_count'] for report in files.values())
+    valid_count = total_records - invalid_count
+    return {
+        'message': f'Validated {total_records} records from {len(files)} files: {valid_count} valid, {invalid_count} invalid (dry run, nothing was written)',
+        'dry_run': True,
+        'total_records': total_records,
+        'valid_count': valid_count,
+        'invalid_count': invalid_count,
+        'error_count': sum(report['error_count'] for report in files.values()),
+        'errors': [
+            f"{report['file']}: {error}"
+            for report in files.values()
+            for error in report['errors']
+        ],
+        'warning_count': sum(report['warning_count'] for report in files.values()),
+        'warnings': [
+            f"{report['file']}: {warning}"
+            for report in files.values()
+            for warning in report['warnings']
+        ],
+        'files': files,
+    }
+
+
+def validate_upload(model_type, file, filename):
+    """Validate an upload without writing it and return the dry-run report"""
+    from .archive import ARCHIVE
+
+    if model_type == ARCHIVE:
+        return validate_archive(file)
+    names = list(Influencer.objects.values_list('name', flat=True))
+    return validate_frame(model_type, read_frame(file, filename), names)
@@ -1,14 +1,24 @@
-import csv
-import json
-from io import StringIO
 from rest_framework import status
 from rest_framework.decorators import api_view, parser_classes
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.db import transaction
+from django.db import connection, transaction
 from influencers.models import Influencer, Post
-from tracking.models import TrackingData
+from tracking.models import TrackingData, TrackingDailyRollup
 from payouts.models import Payout
+from rest_framework.reverse import reverse
+from .ingest import LOADERS, clean_options, create_loader, parse_flag
+from .jobs import get_job, submit_import
+from .analytics import pivot
+from .dashboard import dashboard as dashboard_snapshot
+from .cache import cache_stats, cached_analytics, data_changed
+from .conditional import conditional_get
+from .archive import ARCHIVE, is_archive
+from .idempotency import Fingerprint, IdempotencyConflict
+from .models import UploadRecord
+from .readers import UNSUPPORTED_FORMAT, get_reader
+from .resumable import create_session, discard_session, finalize_session, get_session
+from .validation import validate_upload
 from rest_framework.decorators import api_view, parser_classes
 from rest_framework.response import Response
 from rest_framework import status
@@ -18,220 +28,268 @@ from rest_framework import status
 @parser_classes([MultiPartParser, FormParser])
 def bulk_upload(request):
     """
-    Bulk upload endpoint for CSV/JSON data
+    Bulk upload endpoint for CSV/JSON/Parquet/Arrow data
+    Files are streamed in chunks and written in fixed-size batches
     Supports: influencers, posts, tracking, payouts
+    Pass ?async=1 to queue the import and poll its job status instead
+    commit_mode 'chunk' (default) commits each batch, 'all' is all-or-nothing
+    upsert=1 updates changed posts, tracking and payout rows by natural key
+    A .zip archive of influencers.*, posts.*, tracking.* and payouts.* files
+    is loaded in dependency order and needs no model_type
+    dry_run=1 validates the whole file and reports every bad row without writing
+    A byte-identical re-upload with the same options (or a repeated
+    Idempotency-Key header) returns the first error-free import's result;
+    force=1 imports it again
     """
     model_type = request.data.get('model_type')
     file = request.FILES.get('file')
     
+    if file and is_archive(file.name):
+        model_type = ARCHIVE
+    
     if not model_type or not file:
         return Response({
             'error': 'model_type and file are required'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Validate model type
-    valid_models = {
-        'influencers': Influencer,
-        'posts': Post,
-        'tracking': TrackingData,
-        'payouts': Payout
-    }
-    
-    if model_type not in valid_models:
+    if model_type not in LOADERS and model_type != ARCHIVE:
         return Response({
-            'error': f'Invalid model_type. Must be one of: {list(valid_models.keys())}'
+            'error': f'Invalid model_type. Must be one of: {list(LOADERS.keys())}'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    model_class = valid_models[model_type]
-    
     try:
-        # Read file content
-        content = file.read().decode('utf-8')
-        
-        # Parse based on file extension
-        if file.name.endswith('.csv'):
-            data = parse_csv(content)
-        elif file.name.endswith('.json'):
-            data = json.loads(content)
-        else:
+        # Stream rows from the file based on its extension
+        if model_type != ARCHIVE and get_reader(file.name) is None:
             return Response({
-                'error': 'File must be CSV or JSON format'
+                'error': UNSUPPORTED_FORMAT
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Process data
-        created_count = 0
-        errors = []
+        # Validate the whole file column by column without touching the database
+        if parse_flag(request.data.get('dry_run')):
+            return Response(validate_upload(model_type, file, file.name), status=status.HTTP_200_OK)
         
-        with transaction.atomic():
-            for i, row in enumerate(data):
-                try:
-                    if model_type == 'influencers':
-                        created_count += create_influencer(row)
-                    elif model_type == 'posts':
-                        created_count += create_post(row)
-                    elif model_type == 'tracking':
-                        created_count += create_tracking_data(row)
-                    elif model_type == 'payouts':
-                        created_count += create_payout(row)
-                except Exception as e:
-                    errors.append(f"Row {i+1}: {str(e)}")
+        options = clean_options(
+            model_type,
+            batch_size=request.data.get('batch_size'),
+            commit_mode=request.data.get('commit_mode'),
+            upsert=request.data.get('upsert')
+        )
         
-        total_records = len(data)
-        existing_count = total_records - created_count
+        # Answer repeated deliveries from the stored result of the first import
+        fingerprint = Fingerprint(
+            file,
+            model_type,
+            file.name,
+            options=options,
+            idempotency_key=request.headers.get('Idempotency-Key'),
+            force=parse_flag(request.data.get('force'))
+        )
+        if fingerprint.duplicate:
+            return Response(fingerprint.duplicate_result(), status=status.HTTP_200_OK)
         
-        return Response({
-            'message': f'Processed {total_records} records: {created_count} created, {existing_count} already existed',
-            'created_count': created_count,
-            'existing_count': existing_count,
-            'total_records': total_records,
-            'errors': errors
-        }, status=status.HTTP_201_CREATED)
+        # Hand large imports to the background worker pool
+        if request.query_params.get('async') in ('1', 'true'):
+            job = submit_import(model_type, file, fingerprint, **options)
+            return Response({
+                'message': f'Import of {file.name} queued',
+                'job_id': job.id,
+                'status': job.status,
+                'status_url': reverse('upload_job_status', args=[job.id], request=request)
+            }, status=status.HTTP_202_ACCEPTED)
         
+        # Process data in batches against a single influencer name index
+        loader = create_loader(model_type, **options)
+        result = loader.run_file(file, file.name, **fingerprint.resume)
+        fingerprint.record(result)
+        return Response(result, status=status.HTTP_201_CREATED)
+        
+    except IdempotencyConflict as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_409_CONFLICT)
     except Exception as e:
         return Response({
             'error': f'Upload failed: {str(e)}'
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
-def parse_csv(content):
-    """Parse CSV content into list of dictionaries"""
-    csv_file = StringIO(content)
-    reader = csv.DictReader(csv_file)
-    data = list(reader)
-    
-    # Clean up data by stripping whitespace from all values
-    for row in data:
-        for key, value in row.items():
-            if isinstance(value, str):
-                row[key] = value.strip()
+@api_view(['GET'])
+def upload_job_status(request, job_id):
+    """Report progress of a background upload job"""
+    job = get_job(job_id)
+    if job is None:
+        return Response({
+            'error': f'Upload job {job_id} not found'
+        }, status=status.HTTP_404_NOT_FOUND)
     
-    return data
+    return Response(job.to_dict())
 
 
-def create_influencer(data):
-    """Create influencer from data"""
-    influencer, created = Influencer.objects.get_or_create(
-        name=data['name'],
-        defaults={
-            'category': data.get('category', ''),
-            'gender': data.get('gender', 'other'),
-            'follower_count': int(data.get('follower_count', 0)),
-            'platform': data.get('platform', 'instagram')
-        }
-    )
-    return 1 if created else 0
+@api_view(['POST'])
+def create_upload_session(request):
+    """
+    Start a resumable upload
+    Send model_type, file_name and total_size (plus the usual upload options),
+    then PUT each chunk to chunks/<index>/ and POST to finalize/
+    """
+    try:
+        session = create_session(
+            request.data.get('model_type'),
+            request.data.get('file_name'),
+            request.data.get('total_size'),
+            chunk_size=request.data.get('chunk_size'),
+            batch_size=request.data.get('batch_size'),
+            commit_mode=request.data.get('commit_mode'),
+            upsert=request.data.get('upsert')
+        )
+    except Exception as e:
+        return Response({
+            'error': f'Upload failed: {str(e)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        **session.to_dict(),
+        'session_url': reverse('upload_session', args=[session.id], request=request)
+    }, status=status.HTTP_201_CREATED)
 
 
-def create_post(data):
-    """Create post from data"""
-    try:
-        influencer = Influencer.objects.get(name=data['influencer_name'])
-    except Influencer.DoesNotExist:
-        raise Exception(f"Influencer '{data['influencer_name']}' not found")
+@api_view(['GET', 'DELETE'])
+def upload_session(request, session_id):
+    """Report which chunks of a resumable upload are missing, or abort it"""
+    session = get_session(session_id)
+    if session is None:
+        return Response({
+            'error': f'Upload session {session_id} not found'
+        }, status=status.HTTP_404_NOT_FOUND)
     
-    # Validate and clean date format
-    post_date = data['date'].strip()
-    if not post_date:
-        raise Exception("Post date is required")
+    if request.method == 'DELETE':
+        discard_session(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
     
-    # Try to parse the date to ensure it's valid
-    from datetime import datetime
-    try:
-        datetime.strptime(post_date, '%Y-%m-%d')
-    except ValueError:
-        raise Exception(f"Invalid date format: '{post_date}'. Must be YYYY-MM-DD")
+    return Response(session.to_dict())
+
+
+@api_view(['PUT'])
+def upload_session_chunk(request, session_id, index):
+    """Receive one chunk of a resumable upload as the raw request body"""
+    session = get_session(session_id)
+    if session is None:
+        return Response({
+            'error': f'Upload session {session_id} not found'
+        }, status=status.HTTP_404_NOT_FOUND)
     
-    post, created = Post.objects.get_or_create(
-        influencer=influencer,
-        date=post_date,
-        platform=data.get('platform', 'instagram'),
-        defaults={
-            'url': data.get('url', ''),
-            'caption': data.get('caption', ''),
-            'reach': int(data.get('reach', 0)),
-            'likes': int(data.get('likes', 0)),
-            'comments': int(data.get('comments', 0))
-        }
-    )
-    return 1 if created else 0
-
-
-def create_tracking_data(data):
-    """Create tracking data from data"""
     try:
-        influencer = Influencer.objects.get(name=data['influencer_name'])
-    except Influencer.DoesNotExist:
-        raise Exception(f"Influencer '{data['influencer_name']}' not found")
+        session.write_chunk(index, request.stream)
+    except Exception as e:
+        return Response({
+            'error': f'Upload failed: {str(e)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Validate and clean date format
-    tracking_date = data['date'].strip()
-    if not tracking_date:
-        raise Exception("Tracking date is required")
+    report = session.to_dict()
+    return Response({
+        'index': index,
+        'received_chunks': report['received_chunks'],
+        'total_chunks': report['total_chunks'],
+        'bytes_received': report['bytes_received'],
+        'progress': report['progress'],
+    })
+
+
+@api_view(['POST'])
+def finalize_upload_session(request, session_id):
+    """Queue the import of a resumable upload once every chunk has arrived"""
+    session = get_session(session_id)
+    if session is None:
+        return Response({
+            'error': f'Upload session {session_id} not found'
+        }, status=status.HTTP_404_NOT_FOUND)
     
-    # Try to parse the date to ensure it's valid
-    from datetime import datetime
     try:
-        datetime.strptime(tracking_date, '%Y-%m-%d')
-    except ValueError:
-        raise Exception(f"Invalid date format: '{tracking_date}'. Must be YYYY-MM-DD")
+        session.check_complete()
+        with open(session.path, 'rb') as f:
+            fingerprint = Fingerprint(
+                f,
+                session.model_type,
+                session.file_name,
+                options=session.options,
+                idempotency_key=request.headers.get('Idempotency-Key'),
+                force=parse_flag(request.data.get('force'))
+            )
+        if fingerprint.duplicate:
+            discard_session(session)
+            return Response(fingerprint.duplicate_result(), status=status.HTTP_200_OK)
+        
+        job = finalize_session(session, fingerprint)
+    except IdempotencyConflict as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_409_CONFLICT)
+    except Exception as e:
+        return Response({
+            'error': f'Upload failed: {str(e)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
     
-    tracking_data, created = TrackingData.objects.get_or_create(
-        user_id=data['user_id'],
-        date=tracking_date,
-        product=data['product'],
-        influencer=influencer,
-        defaults={
-            'source': data.get('source', ''),
-            'campaign': data.get('campaign', ''),
-            'brand': data.get('brand', ''),
-            'orders': int(data.get('orders', 0)),
-            'revenue': float(data.get('revenue', 0))
-        }
-    )
-    return 1 if created else 0
-
-
-def create_payout(data):
-    """Create payout from data"""
+    return Response({
+        'message': f'Import of {session.file_name} queued',
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': reverse('upload_job_status', args=[job.id], request=request)
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@cached_analytics('dimensions', 'metrics')
+def analytics_pivot(request):
+    """
+    Break revenue, orders, payouts and ROAS down by any combination of
+    dimensions=platform,category,gender,brand,campaign,month
+    metrics=revenue,orders,payout,roas (default: all)
+    Accepts the dashboard filters: start_date, end_date, influencer__platform,
+    influencer__category, influencer__gender and brand
+    """
     try:
-        influencer = Influencer.objects.get(name=data['influencer_name'])
-    except Influencer.DoesNotExist:
-        raise Exception(f"Influencer '{data['influencer_name']}' not found")
-    
-    # Validate and clean date format
-    payout_date = data['payout_date'].strip()
-    if not payout_date:
-        raise Exception("Payout date is required")
-    
-    # Try to parse the date to ensure it's valid
-    from datetime import datetime
+        return Response(pivot(request.query_params))
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@conditional_get(('tracking', 'payouts', 'influencers'))
+@cached_analytics('panels')
+def dashboard(request):
+    """
+    Every dashboard panel for one set of filters in a single response
+    panels=tracking_summary,payouts_by_platform,... (default: all) selects panels,
+    each shaped like the analytics endpoint it is named after
+    Accepts the dashboard filters: start_date, end_date, influencer__platform,
+    influencer__category, influencer__gender and brand
+    """
     try:
-        datetime.strptime(payout_date, '%Y-%m-%d')
-    except ValueError:
-        raise Exception(f"Invalid date format: '{payout_date}'. Must be YYYY-MM-DD")
-    
-    payout, created = Payout.objects.get_or_create(
-        influencer=influencer,
-        payout_date=payout_date,
-        basis=data.get('basis', 'post'),
-        defaults={
-            'rate': float(data.get('rate', 0)),
-            'orders': int(data.get('orders', 0)),
-            'total_payout': float(data.get('total_payout', 0))
-        }
-    )
-    return 1 if created else 0
+        return Response(dashboard_snapshot(request.query_params))
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+def analytics_cache(request):
+    """Report the analytics cache backend, data version and this worker's hits and misses"""
+    return Response(cache_stats())
 
 
 @api_view(['POST'])
 def clear_database(request):
     """Clear all data from database (for testing purposes)"""
     try:
-        with transaction.atomic():
-            Payout.objects.all().delete()
-            TrackingData.objects.all().delete()
-            Post.objects.all().delete()
-            Influencer.objects.all().delete()
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Plain DELETEs: with every table emptied there are no totals for
+            # the per-row delete handlers to maintain
+            for model in (Payout, TrackingDailyRollup, TrackingData, Post, Influencer, UploadRecord):
+                cursor.execute(f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)}')
+            data_changed()
         
         return Response({
             'message': 'Database cleared successfully',
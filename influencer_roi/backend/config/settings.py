@@ -46,6 +46,7 @@ INSTALLED_APPS = [
     'influencers',
     'tracking',
     'payouts',
+    'api',
 ]
 
 MIDDLEWARE = [
@@ -87,10 +88,36 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': 20,  # Wait for chunked import commits instead of failing with "database is locked"
+        },
     }
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Analytics responses (see api/cache.py). The file-based backend is shared
+    # by every worker on the host; LocMemCache is only safe with one process
+    'analytics': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'analytics_cache',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    },
+}
+ANALYTICS_CACHE = 'analytics'  # Cache alias for analytics responses, None disables caching
+ANALYTICS_SINGLE_FLIGHT_TIMEOUT = 30  # Seconds an identical request waits for one in flight before computing it itself
+ANALYTICS_SINGLE_FLIGHT_LOCK = False  # Also wait on identical requests in other worker processes (needs a shared cache)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -134,7 +161,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework settings
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',  # ?cursor= paging, ?count=false skips the total
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
@@ -149,3 +176,17 @@ REST_FRAMEWORK = {
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True  # For development only
 CORS_ALLOW_CREDENTIALS = True
+
+# Bulk upload settings
+UPLOAD_BATCH_SIZE = 5000  # Rows validated and written per batch; each batch is one commit in chunk mode
+UPLOAD_MAX_BATCH_SIZE = 20000
+UPLOAD_COMMIT_MODE = 'chunk'  # 'chunk' commits every batch, 'all' is all-or-nothing
+UPLOAD_JOB_WORKERS = 2  # Background import threads for ?async=1 uploads
+UPLOAD_JOB_DIR = BASE_DIR / 'upload_jobs'
+UPLOAD_JOB_HISTORY = 100  # Finished jobs kept for the status endpoint
+UPLOAD_JOB_HEARTBEAT = 30  # Seconds between stored status reports of a queued or running job
+UPLOAD_JOB_STALE_AFTER = 10 * 60  # Seconds without a stored report before a queued or running job is reported failed; keep above the longest 'all' mode import
+UPLOAD_DRY_RUN_MAX_ERRORS = 1000  # Row errors listed in a dry_run=1 report
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # Default chunk size for resumable upload sessions
+UPLOAD_MAX_CHUNK_SIZE = 64 * 1024 * 1024
+UPLOAD_SESSION_TTL = 24 * 60 * 60  # Seconds an idle upload session is kept
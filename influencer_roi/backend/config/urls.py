@@ -20,7 +20,10 @@ from rest_framework.routers import DefaultRouter
 from influencers.views import InfluencerViewSet, PostViewSet
 from tracking.views import TrackingDataViewSet
 from payouts.views import PayoutViewSet
-from api.views import bulk_upload, clear_database
+from api.views import (
+    bulk_upload, upload_job_status, create_upload_session, upload_session,
+    upload_session_chunk, finalize_upload_session, analytics_pivot, dashboard, analytics_cache, clear_database
+)
 
 # Create router and register viewsets
 router = DefaultRouter()
@@ -33,5 +36,13 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include(router.urls)),
     path('api/upload/', bulk_upload, name='bulk_upload'),
+    path('api/upload/jobs/<str:job_id>/', upload_job_status, name='upload_job_status'),
+    path('api/upload/sessions/', create_upload_session, name='create_upload_session'),
+    path('api/upload/sessions/<str:session_id>/', upload_session, name='upload_session'),
+    path('api/upload/sessions/<str:session_id>/chunks/<int:index>/', upload_session_chunk, name='upload_session_chunk'),
+    path('api/upload/sessions/<str:session_id>/finalize/', finalize_upload_session, name='finalize_upload_session'),
+    path('api/analytics/pivot/', analytics_pivot, name='analytics_pivot'),
+    path('api/analytics/cache/', analytics_cache, name='analytics_cache'),
+    path('api/dashboard/', dashboard, name='dashboard'),
     path('api/clear/', clear_database, name='clear_database'),
 ]
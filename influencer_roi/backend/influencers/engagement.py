@@ -0,0 +1,103 @@
+"""
+Maintenance of the stored engagement totals of influencers
+
+Loaders add the posts of every written batch as signed per-influencer
+deltas in one UPDATE statement, post saves and queryset updates recompute
+the influencers they touch, deleted posts are taken out as deltas however
+they were deleted (see the post_delete handler on Post), and `recompute()`
+rebuilds every influencer from its posts.
+"""
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Influencer, Post
+
+# Engagement rate of one post, as in Post.engagement_rate
+POST_ENGAGEMENT = ExpressionWrapper(
+    (F('likes') + F('comments')) * Value(100.0) / F('reach'),
+    output_field=FloatField()
+)
+
+
+def post_engagement(reach, likes, comments):
+    """Return the engagement rate of a post from its counts"""
+    if not reach:
+        return 0
+    return (likes + comments) / reach * 100
+
+
+def refresh_engagement(influencer_ids):
+    """Recompute the engagement totals of the given influencers from their posts"""
+    influencer_ids = list(influencer_ids)
+    if not influencer_ids:
+        return
+    totals = {
+        row['influencer_id']: row
+        for row in Post.objects.filter(influencer_id__in=influencer_ids).order_by().values('influencer_id').annotate(
+            posts=Count('id'),
+            reach_sum=Sum('reach'),
+            engagement=Coalesce(Sum(POST_ENGAGEMENT, filter=Q(reach__gt=0)), 0.0)
+        )
+    }
+
+    influencers = []
+    for influencer_id in influencer_ids:
+        row = totals.get(influencer_id, {'posts': 0, 'reach_sum': 0, 'engagement': 0.0})
+        influencers.append(Influencer(
+            id=influencer_id,
+            post_count=row['posts'],
+            total_reach=row['reach_sum'] or 0,
+            total_engagement=row['engagement'],
+            engagement_rate=row['engagement'] / row['posts'] if row['posts'] else 0,
+        ))
+    Influencer.objects.bulk_update(influencers, Influencer.ENGAGEMENT_FIELDS, batch_size=500)
+
+
+def recompute(batch_size=1000):
+    """Recompute the engagement totals of every influencer, returning how many were updated"""
+    ids = list(Influencer.objects.order_by().values_list('id', flat=True))
+    for start in range(0, len(ids), batch_size):
+        with transaction.atomic():
+            refresh_engagement(ids[start:start + batch_size])
+    return len(ids)
+
+
+class EngagementDelta:
+    """
+    Signed per-influencer changes to the engagement totals, applied with a single UPDATE
+    """
+
+    def __init__(self):
+        self.influencers = defaultdict(lambda: [0, 0, 0.0])
+
+    def add(self, influencer_id, reach, likes, comments, sign=1):
+        """Count a post into (sign=1) or out of (sign=-1) its influencer's totals"""
+        totals = self.influencers[influencer_id]
+        totals[0] += sign
+        totals[1] += sign * reach
+        totals[2] += sign * post_engagement(reach, likes, comments)
+
+    def apply(self):
+        rows = [(key, totals) for key, totals in self.influencers.items() if any(totals)]
+        if not rows:
+            return
+
+        opts = Influencer._meta
+        quote = connection.ops.quote_name
+        posts, reach, engagement, rate = (quote(opts.get_field(name).column) for name in Influencer.ENGAGEMENT_FIELDS)
+        sql = (
+            f'UPDATE {quote(opts.db_table)} SET '
+            f'{posts} = {posts} + %s, {reach} = {reach} + %s, {engagement} = {engagement} + %s, '
+            f'{rate} = CASE WHEN {posts} + %s > 0 THEN ({engagement} + %s) / ({posts} + %s) ELSE 0 END '
+            f'WHERE {quote(opts.pk.column)} = %s'
+        )
+        pk = opts.pk
+        params = [
+            (count, reach_delta, engagement_delta, count, engagement_delta, count, pk.get_db_prep_value(key, connection))
+            for key, (count, reach_delta, engagement_delta) in rows
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
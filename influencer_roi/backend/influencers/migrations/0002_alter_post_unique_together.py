@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:50
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('influencers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='post',
+            unique_together={('influencer', 'date', 'platform')},
+        ),
+    ]
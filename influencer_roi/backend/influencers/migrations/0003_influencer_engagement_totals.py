@@ -0,0 +1,62 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:23
+
+from django.db import migrations, models
+
+
+def populate_engagement(apps, schema_editor):
+    Influencer = apps.get_model('influencers', 'Influencer')
+    Post = apps.get_model('influencers', 'Post')
+    totals = {}
+    for post in Post.objects.values('influencer_id', 'reach', 'likes', 'comments').iterator():
+        row = totals.setdefault(post['influencer_id'], [0, 0, 0.0])
+        row[0] += 1
+        row[1] += post['reach']
+        if post['reach'] > 0:
+            row[2] += (post['likes'] + post['comments']) / post['reach'] * 100
+
+    influencers = [
+        Influencer(
+            id=influencer_id,
+            post_count=posts,
+            total_reach=reach,
+            total_engagement=engagement,
+            engagement_rate=engagement / posts,
+        )
+        for influencer_id, (posts, reach, engagement) in totals.items()
+    ]
+    Influencer.objects.bulk_update(
+        influencers,
+        ['post_count', 'total_reach', 'total_engagement', 'engagement_rate'],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('influencers', '0002_alter_post_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='influencer',
+            name='engagement_rate',
+            field=models.FloatField(default=0, editable=False, help_text='Average engagement rate of the posts'),
+        ),
+        migrations.AddField(
+            model_name='influencer',
+            name='post_count',
+            field=models.IntegerField(default=0, editable=False, help_text='Number of posts'),
+        ),
+        migrations.AddField(
+            model_name='influencer',
+            name='total_engagement',
+            field=models.FloatField(default=0, editable=False, help_text='Summed engagement rate of all posts'),
+        ),
+        migrations.AddField(
+            model_name='influencer',
+            name='total_reach',
+            field=models.BigIntegerField(default=0, editable=False, help_text='Summed reach of all posts'),
+        ),
+        migrations.RunPython(populate_engagement, migrations.RunPython.noop),
+    ]
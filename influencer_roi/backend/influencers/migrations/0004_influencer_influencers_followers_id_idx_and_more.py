@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('influencers', '0003_influencer_engagement_totals'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='influencer',
+            index=models.Index(fields=['follower_count', 'id'], name='influencers_followers_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['date', 'created_at', 'id'], name='posts_date_created_id_idx'),
+        ),
+    ]
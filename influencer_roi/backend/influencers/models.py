@@ -1,5 +1,7 @@
 import uuid
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 
 
 class Influencer(models.Model):
@@ -26,30 +28,79 @@ class Influencer(models.Model):
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES, help_text="Influencer's gender")
     follower_count = models.IntegerField(default=0, help_text="Number of followers")
     platform = models.CharField(max_length=20, choices=PLATFORM_CHOICES, help_text="Primary platform")
+    post_count = models.IntegerField(default=0, editable=False, help_text="Number of posts")
+    total_reach = models.BigIntegerField(default=0, editable=False, help_text="Summed reach of all posts")
+    total_engagement = models.FloatField(default=0, editable=False, help_text="Summed engagement rate of all posts")
+    engagement_rate = models.FloatField(default=0, editable=False, help_text="Average engagement rate of the posts")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Maintained from the posts with in-place updates (see influencers/engagement.py)
+    ENGAGEMENT_FIELDS = ('post_count', 'total_reach', 'total_engagement', 'engagement_rate')
+    
     class Meta:
         db_table = 'influencers'
         ordering = ['-follower_count']
         verbose_name = 'Influencer'
         verbose_name_plural = 'Influencers'
+        # List pages, read backwards from the largest audience
+        indexes = [
+            models.Index(fields=['follower_count', 'id'], name='influencers_followers_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.platform})"
     
-    @property
-    def engagement_rate(self):
-        """Calculate average engagement rate from posts"""
-        posts = self.posts.all()
-        if not posts:
-            return 0
+    def save(self, *args, **kwargs):
+        # Never write back engagement totals from an instance that may be stale
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.ENGAGEMENT_FIELDS
+            ]
+        from api.cache import data_changed
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            data_changed('influencers')
+    
+    def delete(self, *args, **kwargs):
+        from api.cache import data_changed
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            # Its posts, tracking rows and payouts are deleted with it
+            data_changed()
+        return result
+
+
+class PostQuerySet(models.QuerySet):
+    """
+    Posts, keeping the engagement totals of influencers in step with updates
+    """
+    
+    # Fields the engagement totals are computed from
+    ENGAGEMENT_INPUTS = {'influencer', 'influencer_id', 'reach', 'likes', 'comments'}
+    
+    def update(self, **kwargs):
+        from api.cache import data_changed
+        from .engagement import recompute, refresh_engagement
+        if not self.ENGAGEMENT_INPUTS & kwargs.keys():
+            with transaction.atomic():
+                rows = super().update(**kwargs)
+                data_changed('posts')
+            return rows
         
-        total_engagement = sum(
-            (post.likes + post.comments) / post.reach * 100 
-            for post in posts if post.reach > 0
-        )
-        return total_engagement / len(posts) if posts else 0
+        with transaction.atomic():
+            influencer_ids = set(self.order_by().values_list('influencer_id', flat=True).distinct())
+            rows = super().update(**kwargs)
+            target = kwargs.get('influencer', kwargs.get('influencer_id'))
+            if hasattr(target, 'resolve_expression'):
+                # Posts may have moved to any influencer
+                recompute()
+            else:
+                influencer_ids.add(getattr(target, 'pk', target))
+                refresh_engagement(influencer_ids - {None})
+            data_changed('posts', 'influencers')
+        return rows
 
 
 class Post(models.Model):
@@ -80,18 +131,53 @@ class Post(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = PostQuerySet.as_manager()
+    
     class Meta:
         db_table = 'posts'
         ordering = ['-date', '-created_at']
         verbose_name = 'Post'
         verbose_name_plural = 'Posts'
+        unique_together = ['influencer', 'date', 'platform']
+        # List pages, read backwards from the newest post
+        indexes = [
+            models.Index(fields=['date', 'created_at', 'id'], name='posts_date_created_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.influencer.name} - {self.date} ({self.platform})"
     
+    def save(self, *args, **kwargs):
+        from api.cache import data_changed
+        from .engagement import refresh_engagement
+        previous = None
+        if self.pk:
+            previous = Post.objects.filter(pk=self.pk).values_list('influencer_id', flat=True).first()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            refresh_engagement({self.influencer_id, previous} - {None})
+            data_changed('posts', 'influencers')
+    
     @property
     def engagement_rate(self):
         """Calculate engagement rate for this post"""
         if self.reach == 0:
             return 0
-        return ((self.likes + self.comments) / self.reach) * 100 
\ No newline at end of file
+        return ((self.likes + self.comments) / self.reach) * 100
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, origin=None, **kwargs):
+    """
+    Take a deleted post out of its influencer's engagement totals, whether
+    it was deleted on its own, with a queryset or by a cascade
+    """
+    from api.cache import data_changed
+    from .engagement import EngagementDelta
+    data_changed('posts', 'influencers')
+    # Posts deleted along with their influencer leave no totals to update
+    if isinstance(origin, Influencer) or getattr(origin, 'model', None) is Influencer:
+        return
+    delta = EngagementDelta()
+    delta.add(instance.influencer_id, instance.reach, instance.likes, instance.comments, sign=-1)
+    delta.apply()
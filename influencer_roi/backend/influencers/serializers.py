@@ -19,13 +19,18 @@ class InfluencerSerializer(serializers.ModelSerializer):
     
     def get_total_posts(self, obj):
         """Get total number of posts for this influencer"""
-        return obj.posts.count()
+        return obj.post_count
     
     def get_total_revenue(self, obj):
         """Get total revenue generated by this influencer"""
-        from tracking.models import TrackingData
-        tracking_data = TrackingData.objects.filter(influencer=obj)
-        return sum(td.revenue for td in tracking_data)
+        # Annotated by InfluencerViewSet; single instances fall back to one query
+        if hasattr(obj, 'total_revenue'):
+            return obj.total_revenue or 0
+        from tracking.models import TrackingDailyRollup
+        from django.db.models import Sum
+        return TrackingDailyRollup.objects.filter(influencer=obj).aggregate(
+            total=Sum('revenue')
+        )['total'] or 0
 
 
 class PostSerializer(serializers.ModelSerializer):
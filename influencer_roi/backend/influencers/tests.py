@@ -0,0 +1,118 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from influencers.models import Influencer, Post
+from tracking.models import TrackingData
+
+
+def create_influencers(count, start=0):
+    """Create influencers, each with a post and a tracked order"""
+    for i in range(start, start + count):
+        influencer = Influencer.objects.create(
+            name=f'Influencer {i}',
+            category='Fashion',
+            gender='female',
+            follower_count=1000 + i,
+            platform='instagram'
+        )
+        Post.objects.create(influencer=influencer, platform='instagram', date=date(2024, 1, 1), reach=100, likes=10)
+        TrackingData.objects.create(
+            source='Shopify',
+            campaign='Spring',
+            brand='Nike',
+            influencer=influencer,
+            user_id=f'user_{i}',
+            product='Shoes',
+            date=date(2024, 1, 1),
+            orders=1,
+            revenue=Decimal('50.00')
+        )
+    return influencer
+
+
+@override_settings(ANALYTICS_CACHE=None)
+class InfluencerQueryBudgetTests(TestCase):
+    """The influencer endpoints run a fixed number of queries whatever the number of rows"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_list(self):
+        create_influencers(3)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/influencers/', {'page_size': 100})
+        self.assertEqual(len(response.data['results']), 3)
+
+        create_influencers(40, start=3)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/influencers/', {'page_size': 100})
+        self.assertEqual(len(response.data['results']), 43)
+        self.assertEqual(response.data['results'][0]['total_revenue'], 50)
+
+    def test_retrieve(self):
+        influencer = create_influencers(1)
+        with self.assertNumQueries(2):
+            self.client.get(f'/api/influencers/{influencer.id}/')
+
+        for day in range(2, 30):
+            Post.objects.create(influencer=influencer, platform='instagram', date=date(2024, 1, day), reach=100)
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/influencers/{influencer.id}/')
+        self.assertEqual(len(response.data['posts']), 29)
+
+    def test_top_performers(self):
+        create_influencers(3)
+        with self.assertNumQueries(1):
+            self.client.get('/api/influencers/top_performers/')
+
+        create_influencers(20, start=3)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/influencers/top_performers/')
+        self.assertEqual(len(response.data), 10)
+
+
+class EngagementTotalsTests(TestCase):
+    """Stored engagement totals follow posts however they are written or deleted"""
+
+    def setUp(self):
+        self.influencer = create_influencers(1)
+        self.other = create_influencers(1, start=1)
+        for day in range(2, 12):
+            Post.objects.create(
+                influencer=self.influencer,
+                platform='instagram',
+                date=date(2024, 1, day),
+                reach=100 * day,
+                likes=day,
+                comments=2
+            )
+
+    def assertTotals(self, influencer):
+        influencer.refresh_from_db()
+        posts = list(influencer.posts.all())
+        self.assertEqual(influencer.post_count, len(posts))
+        self.assertEqual(influencer.total_reach, sum(post.reach for post in posts))
+        expected = sum(post.engagement_rate for post in posts) / len(posts) if posts else 0
+        self.assertAlmostEqual(influencer.engagement_rate, expected)
+
+    def test_queryset_delete(self):
+        deleted, _ = Post.objects.filter(influencer=self.influencer, date__gte=date(2024, 1, 6)).delete()
+        self.assertEqual(deleted, 6)
+        self.assertTotals(self.influencer)
+        self.assertEqual(self.influencer.post_count, 5)
+
+        Post.objects.filter(influencer=self.influencer).delete()
+        self.assertTotals(self.influencer)
+        self.assertEqual(self.influencer.post_count, 0)
+
+    def test_queryset_update(self):
+        Post.objects.filter(influencer=self.influencer, date__lte=date(2024, 1, 4)).update(reach=1000, likes=50)
+        self.assertTotals(self.influencer)
+
+        Post.objects.filter(influencer=self.influencer, date__gte=date(2024, 1, 8)).update(influencer=self.other)
+        self.assertTotals(self.influencer)
+        self.assertTotals(self.other)
+        self.assertEqual(self.other.post_count, 5)
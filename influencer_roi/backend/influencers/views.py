@@ -2,20 +2,42 @@ from rest_framework import viewsets, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from api.conditional import ConditionalGetMixin
 from .models import Influencer, Post
 from .serializers import InfluencerSerializer, PostSerializer, InfluencerDetailSerializer
 
 
-class InfluencerViewSet(viewsets.ModelViewSet):
+class InfluencerViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet for Influencer model"""
     queryset = Influencer.objects.all()
     serializer_class = InfluencerSerializer
+    data_tables = ('influencers', 'posts', 'tracking')
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['platform', 'category', 'gender']
+    filterset_fields = {
+        'platform': ['exact'],
+        'category': ['exact'],
+        'gender': ['exact'],
+        'engagement_rate': ['gte', 'lte'],
+    }
     search_fields = ['name', 'category']
-    ordering_fields = ['follower_count', 'created_at', 'name']
+    ordering_fields = ['follower_count', 'created_at', 'name', 'engagement_rate', 'post_count']
     ordering = ['-follower_count']
     
+    def get_queryset(self):
+        """Influencers annotated with their total revenue, with posts prefetched for retrieve"""
+        from tracking.models import TrackingDailyRollup
+        from django.db.models import OuterRef, Prefetch, Subquery, Sum
+        
+        revenue = TrackingDailyRollup.objects.filter(influencer=OuterRef('pk')).order_by().values(
+            'influencer'
+        ).annotate(total=Sum('revenue')).values('total')
+        queryset = super().get_queryset().annotate(total_revenue=Subquery(revenue))
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(
+                Prefetch('posts', queryset=Post.objects.select_related('influencer'))
+            )
+        return queryset
+    
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return InfluencerDetailSerializer
@@ -24,13 +46,8 @@ class InfluencerViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def top_performers(self, request):
         """Get top performing influencers by revenue"""
-        from tracking.models import TrackingData
-        from django.db.models import Sum
-        
         # Get influencers with highest revenue
-        influencers = Influencer.objects.annotate(
-            total_revenue=Sum('tracking_data__revenue')
-        ).filter(total_revenue__gt=0).order_by('-total_revenue')[:10]
+        influencers = self.get_queryset().filter(total_revenue__gt=0).order_by('-total_revenue')[:10]
         
         serializer = self.get_serializer(influencers, many=True)
         return Response(serializer.data)
@@ -58,15 +75,16 @@ class InfluencerViewSet(viewsets.ModelViewSet):
         return Response(categories)
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet for Post model"""
     queryset = Post.objects.select_related('influencer').all()
     serializer_class = PostSerializer
+    data_tables = ('posts', 'influencers')
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['platform', 'influencer', 'date']
     search_fields = ['caption', 'influencer__name']
     ordering_fields = ['date', 'reach', 'likes', 'comments', 'created_at']
-    ordering = ['-date']
+    ordering = ['-date', '-created_at']
     
     @action(detail=False, methods=['get'])
     def top_engaging(self, request):
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payouts', '0003_payout_payouts_date_influencer_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payout',
+            index=models.Index(fields=['payout_date', 'id'], name='payouts_date_id_idx'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from influencers.models import Influencer
 
 
@@ -44,22 +44,46 @@ class Payout(models.Model):
         ordering = ['-payout_date', '-created_at']
         verbose_name = 'Payout'
         verbose_name_plural = 'Payouts'
+        unique_together = ['influencer', 'payout_date', 'basis']
+        # Lookups by influencer and date are served by the unique index above
+        indexes = [
+            models.Index(fields=['payout_date', 'influencer'], name='payouts_date_influencer_idx'),
+            # List pages, read backwards from the latest payout
+            models.Index(fields=['payout_date', 'id'], name='payouts_date_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.influencer.name} - {self.payout_date} (${self.total_payout})"
     
+    def save(self, *args, **kwargs):
+        from api.cache import data_changed
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            data_changed('payouts')
+    
+    def delete(self, *args, **kwargs):
+        from api.cache import data_changed
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            data_changed('payouts')
+        return result
+    
     @property
     def roas(self):
         """Calculate ROAS (Return on Ad Spend)"""
-        # Get total revenue for this influencer around the payout date
-        from tracking.models import TrackingData
-        tracking_data = TrackingData.objects.filter(
-            influencer=self.influencer,
-            date__gte=self.payout_date,
-            date__lte=self.payout_date
-        )
-        total_revenue = sum(td.revenue for td in tracking_data)
+        # PayoutViewSet annotates list pages with the revenue of every payout
+        # in one query; otherwise look up the revenue for this payout alone
+        if hasattr(self, 'tracking_revenue'):
+            total_revenue = self.tracking_revenue
+        else:
+            from django.db.models import Sum
+            from tracking.models import TrackingDailyRollup
+            total_revenue = TrackingDailyRollup.objects.filter(
+                influencer_id=self.influencer_id,
+                date=self.payout_date
+            ).aggregate(total=Sum('revenue'))['total']
+        total_revenue = total_revenue or 0
         
         if self.total_payout == 0:
             return 0
-        return total_revenue / self.total_payout 
\ No newline at end of file
+        return total_revenue / self.total_payout
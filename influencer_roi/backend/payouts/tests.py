@@ -0,0 +1,72 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from influencers.models import Influencer
+from payouts.models import Payout
+from tracking.models import TrackingData
+
+
+def create_payouts(count, start=0):
+    """Create payouts, each for its own influencer with revenue on the payout date"""
+    for i in range(start, start + count):
+        influencer = Influencer.objects.create(
+            name=f'Influencer {i}',
+            category='Tech',
+            gender='male',
+            follower_count=1000,
+            platform='youtube'
+        )
+        TrackingData.objects.create(
+            source='Shopify',
+            campaign='Launch',
+            brand='Apple',
+            influencer=influencer,
+            user_id=f'user_{i}',
+            product='Phone',
+            date=date(2024, 2, 1),
+            orders=2,
+            revenue=Decimal('300.00')
+        )
+        payout = Payout.objects.create(
+            influencer=influencer,
+            basis='post',
+            rate=Decimal('100.00'),
+            orders=2,
+            total_payout=Decimal('100.00'),
+            payout_date=date(2024, 2, 1)
+        )
+    return payout
+
+
+@override_settings(ANALYTICS_CACHE=None)
+class PayoutQueryBudgetTests(TestCase):
+    """The payout endpoints run a fixed number of queries whatever the number of rows"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_list(self):
+        create_payouts(3)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/payouts/', {'page_size': 100})
+        self.assertEqual(len(response.data['results']), 3)
+
+        create_payouts(40, start=3)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/payouts/', {'page_size': 100})
+        self.assertEqual(len(response.data['results']), 43)
+        self.assertEqual(response.data['results'][0]['roas'], 3.0)
+
+    def test_list_without_count(self):
+        create_payouts(25)
+        with self.assertNumQueries(1):
+            self.client.get('/api/payouts/', {'page_size': 100, 'count': 'false'})
+
+    def test_retrieve(self):
+        payout = create_payouts(5)
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/payouts/{payout.id}/')
+        self.assertEqual(response.data['roas'], 3.0)
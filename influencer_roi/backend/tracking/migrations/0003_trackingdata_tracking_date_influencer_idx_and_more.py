@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0002_trackingdata_brand'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trackingdata',
+            index=models.Index(fields=['date', 'influencer'], name='tracking_date_influencer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trackingdata',
+            index=models.Index(fields=['influencer', 'date'], name='tracking_influencer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trackingdata',
+            index=models.Index(fields=['brand', 'date'], name='tracking_brand_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trackingdata',
+            index=models.Index(fields=['campaign', 'date'], name='tracking_campaign_date_idx'),
+        ),
+    ]
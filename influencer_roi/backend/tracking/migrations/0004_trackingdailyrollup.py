@@ -0,0 +1,62 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+
+
+def populate_rollup(apps, schema_editor):
+    TrackingData = apps.get_model('tracking', 'TrackingData')
+    TrackingDailyRollup = apps.get_model('tracking', 'TrackingDailyRollup')
+    groups = TrackingData.objects.order_by().values(
+        'date', 'influencer_id', 'brand', 'campaign', 'source'
+    ).annotate(total_orders=Sum('orders'), total_revenue=Sum('revenue'), total_rows=Count('id'))
+    TrackingDailyRollup.objects.bulk_create(
+        (
+            TrackingDailyRollup(
+                date=group['date'],
+                influencer_id=group['influencer_id'],
+                brand=group['brand'],
+                campaign=group['campaign'],
+                source=group['source'],
+                orders=group['total_orders'],
+                revenue=group['total_revenue'],
+                row_count=group['total_rows'],
+            )
+            for group in groups.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('influencers', '0002_alter_post_unique_together'),
+        ('tracking', '0003_trackingdata_tracking_date_influencer_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackingDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Date of the tracking events')),
+                ('brand', models.CharField(default='', help_text='Brand name', max_length=255)),
+                ('campaign', models.CharField(help_text='Campaign name or identifier', max_length=255)),
+                ('source', models.CharField(help_text='Data source', max_length=100)),
+                ('orders', models.BigIntegerField(default=0, help_text='Total orders')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, help_text='Total revenue', max_digits=16)),
+                ('row_count', models.IntegerField(default=0, help_text='Number of tracking rows')),
+                ('influencer', models.ForeignKey(help_text='Associated influencer', on_delete=django.db.models.deletion.CASCADE, related_name='tracking_rollups', to='influencers.influencer')),
+            ],
+            options={
+                'verbose_name': 'Tracking Daily Rollup',
+                'verbose_name_plural': 'Tracking Daily Rollups',
+                'db_table': 'tracking_daily_rollup',
+                'indexes': [models.Index(fields=['influencer', 'date'], name='rollup_influencer_date_idx'), models.Index(fields=['brand', 'date'], name='rollup_brand_date_idx')],
+                'unique_together': {('date', 'influencer', 'brand', 'campaign', 'source')},
+            },
+        ),
+        migrations.RunPython(populate_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0004_trackingdailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trackingdata',
+            index=models.Index(fields=['date', 'created_at', 'id'], name='tracking_date_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('influencers', '0004_influencer_influencers_followers_id_idx_and_more'),
+        ('tracking', '0005_trackingdata_tracking_date_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='trackingdata',
+            name='tracking_date_influencer_idx',
+        ),
+        migrations.AlterField(
+            model_name='trackingdata',
+            name='influencer',
+            field=models.ForeignKey(db_index=False, help_text='Associated influencer', on_delete=django.db.models.deletion.CASCADE, related_name='tracking_data', to='influencers.influencer'),
+        ),
+    ]
@@ -1,7 +1,49 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from influencers.models import Influencer
 
 
+class TrackingDataQuerySet(models.QuerySet):
+    """
+    Tracking rows, keeping the daily rollup in step with updates
+    """
+    
+    # Fields the rollup is grouped or summed by
+    ROLLUP_INPUTS = {'date', 'influencer', 'influencer_id', 'brand', 'campaign', 'source', 'orders', 'revenue'}
+    
+    def update(self, **kwargs):
+        from api.cache import data_changed
+        from .rollup import GROUP_FIELDS, rebuild, refresh_groups
+        if not self.ROLLUP_INPUTS & kwargs.keys():
+            with transaction.atomic():
+                rows = super().update(**kwargs)
+                data_changed('tracking')
+            return rows
+        
+        values = dict(kwargs)
+        if 'influencer' in values:
+            influencer = values.pop('influencer')
+            values['influencer_id'] = getattr(influencer, 'pk', influencer)
+        moved = {field: values[field] for field in GROUP_FIELDS if field in values}
+        
+        with transaction.atomic():
+            keys = set(self.order_by().values_list(*GROUP_FIELDS).distinct())
+            rows = super().update(**kwargs)
+            if any(hasattr(value, 'resolve_expression') for value in moved.values()):
+                # Rows may have moved to any group
+                rebuild()
+            else:
+                # The groups the rows were in and the ones they moved to
+                keys |= {
+                    tuple(moved.get(field, value) for field, value in zip(GROUP_FIELDS, key))
+                    for key in keys
+                }
+                refresh_groups(keys)
+            data_changed('tracking')
+        return rows
+
+
 class TrackingData(models.Model):
     """
     TrackingData model to store campaign performance and revenue tracking
@@ -13,6 +55,7 @@ class TrackingData(models.Model):
         Influencer,
         on_delete=models.CASCADE,
         related_name='tracking_data',
+        db_index=False,  # Covered by the (influencer, date) index
         help_text="Associated influencer"
     )
     user_id = models.CharField(max_length=255, help_text="User identifier from tracking system")
@@ -28,19 +71,96 @@ class TrackingData(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = TrackingDataQuerySet.as_manager()
+    
     class Meta:
         db_table = 'tracking_data'
         ordering = ['-date', '-created_at']
         verbose_name = 'Tracking Data'
         verbose_name_plural = 'Tracking Data'
         unique_together = ['user_id', 'date', 'product', 'influencer']
+        # The analytics endpoints read TrackingDailyRollup; these serve the
+        # list filters, rollup refreshes and influencer cascades
+        indexes = [
+            models.Index(fields=['influencer', 'date'], name='tracking_influencer_date_idx'),
+            models.Index(fields=['brand', 'date'], name='tracking_brand_date_idx'),
+            models.Index(fields=['campaign', 'date'], name='tracking_campaign_date_idx'),
+            # List pages, read backwards from the newest row
+            models.Index(fields=['date', 'created_at', 'id'], name='tracking_date_created_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.campaign} - {self.influencer.name} - {self.date}"
     
+    def save(self, *args, **kwargs):
+        from api.cache import data_changed
+        from .rollup import refresh_groups, rollup_key
+        previous = None
+        if self.pk:
+            previous = TrackingData.objects.filter(pk=self.pk).values_list(
+                'date', 'influencer_id', 'brand', 'campaign', 'source'
+            ).first()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            refresh_groups({rollup_key(self), previous} - {None})
+            data_changed('tracking')
+    
     @property
     def average_order_value(self):
         """Calculate average order value"""
         if self.orders == 0:
             return 0
-        return self.revenue / self.orders 
\ No newline at end of file
+        return self.revenue / self.orders 
+
+
+class TrackingDailyRollup(models.Model):
+    """
+    Tracking totals per day, influencer, brand, campaign and source
+
+    Kept in step with TrackingData by the upload loaders, model writes,
+    queryset updates and delete handlers, so the dashboard aggregates scan one row per group and day instead of
+    every tracked order.
+    """
+    date = models.DateField(help_text="Date of the tracking events")
+    influencer = models.ForeignKey(
+        Influencer,
+        on_delete=models.CASCADE,
+        related_name='tracking_rollups',
+        help_text="Associated influencer"
+    )
+    brand = models.CharField(max_length=255, default="", help_text="Brand name")
+    campaign = models.CharField(max_length=255, help_text="Campaign name or identifier")
+    source = models.CharField(max_length=100, help_text="Data source")
+    orders = models.BigIntegerField(default=0, help_text="Total orders")
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0, help_text="Total revenue")
+    row_count = models.IntegerField(default=0, help_text="Number of tracking rows")
+    
+    class Meta:
+        db_table = 'tracking_daily_rollup'
+        verbose_name = 'Tracking Daily Rollup'
+        verbose_name_plural = 'Tracking Daily Rollups'
+        unique_together = ['date', 'influencer', 'brand', 'campaign', 'source']
+        indexes = [
+            models.Index(fields=['influencer', 'date'], name='rollup_influencer_date_idx'),
+            models.Index(fields=['brand', 'date'], name='rollup_brand_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.campaign} - {self.influencer_id} - {self.date}"
+
+
+@receiver(post_delete, sender=TrackingData)
+def tracking_deleted(sender, instance, origin=None, **kwargs):
+    """
+    Take a deleted tracking row out of its rollup group, whether it was
+    deleted on its own, with a queryset or by a cascade
+    """
+    from api.cache import data_changed
+    from .rollup import RollupDelta, rollup_key
+    data_changed('tracking')
+    # The rollup rows of a deleted influencer are deleted by their own cascade
+    if isinstance(origin, Influencer) or getattr(origin, 'model', None) is Influencer:
+        return
+    delta = RollupDelta()
+    delta.add(rollup_key(instance), instance.orders, instance.revenue, sign=-1)
+    delta.apply()
@@ -0,0 +1,133 @@
+"""
+Maintenance of the daily tracking rollup
+
+Loaders add the changes of every written batch as signed deltas in one
+upsert statement, row saves and queryset updates recompute the groups they
+touch, deleted rows are taken out as deltas however they were deleted (see
+the post_delete handler on TrackingData), and `rebuild()` recomputes a date
+range from the raw rows.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Count, Q, Sum
+
+from .models import TrackingData, TrackingDailyRollup
+
+# Fields identifying a rollup group, as attribute names of both models
+GROUP_FIELDS = ('date', 'influencer_id', 'brand', 'campaign', 'source')
+
+# Rollup columns in the order the aggregate query selects them
+COLUMNS = GROUP_FIELDS + ('orders', 'revenue', 'row_count')
+
+
+def rollup_key(obj):
+    """Return the rollup group of a TrackingData instance"""
+    return tuple(getattr(obj, field) for field in GROUP_FIELDS)
+
+
+def group_filter(keys):
+    """Return a Q matching the rows of the given groups"""
+    return reduce(or_, [Q(**dict(zip(GROUP_FIELDS, key))) for key in keys])
+
+
+def insert_groups(queryset):
+    """Aggregate a TrackingData queryset into rollup rows with one INSERT ... SELECT"""
+    groups = queryset.order_by().values(*GROUP_FIELDS).annotate(
+        total_orders=Sum('orders'),
+        total_revenue=Sum('revenue'),
+        total_rows=Count('id'),
+    )
+    sql, params = groups.query.sql_with_params()
+    quote = connection.ops.quote_name
+    opts = TrackingDailyRollup._meta
+    columns = ', '.join(quote(opts.get_field(name).column) for name in COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {quote(opts.db_table)} ({columns}) {sql}', params)
+        return cursor.rowcount
+
+
+def refresh_groups(keys):
+    """Recompute the given rollup groups from the raw tracking rows"""
+    keys = [key for key in keys if key]
+    if not keys:
+        return
+    match = group_filter(keys)
+    with transaction.atomic():
+        TrackingDailyRollup.objects.filter(match).delete()
+        insert_groups(TrackingData.objects.filter(match))
+
+
+def rebuild(start_date=None, end_date=None):
+    """Recompute the rollup for a date range (all dates by default), returning the group count"""
+    rollups = TrackingDailyRollup.objects.all()
+    tracking = TrackingData.objects.all()
+    if start_date:
+        rollups = rollups.filter(date__gte=start_date)
+        tracking = tracking.filter(date__gte=start_date)
+    if end_date:
+        rollups = rollups.filter(date__lte=end_date)
+        tracking = tracking.filter(date__lte=end_date)
+
+    with transaction.atomic():
+        rollups.delete()
+        return insert_groups(tracking)
+
+
+class RollupDelta:
+    """
+    Signed changes to rollup groups, applied with a single upsert
+    """
+
+    def __init__(self):
+        self.groups = defaultdict(lambda: [0, Decimal(0), 0])
+        revenue = TrackingData._meta.get_field('revenue')
+        self._revenue = revenue
+        self._cent = Decimal(1).scaleb(-revenue.decimal_places)
+
+    def add(self, key, orders, revenue, sign=1):
+        """Count a tracking row into (sign=1) or out of (sign=-1) its group"""
+        revenue = self._revenue.to_python(revenue).quantize(self._cent)
+        group = self.groups[key]
+        group[0] += sign * orders
+        group[1] += sign * revenue
+        group[2] += sign
+
+    def apply(self):
+        rows = [key + tuple(totals) for key, totals in self.groups.items() if any(totals)]
+        if not rows:
+            return
+
+        opts = TrackingDailyRollup._meta
+        fields = [opts.get_field(name) for name in COLUMNS]
+        quote = connection.ops.quote_name
+        table = quote(opts.db_table)
+        columns = ', '.join(quote(field.column) for field in fields)
+        placeholders = ', '.join(['%s'] * len(fields))
+        key = ', '.join(quote(field.column) for field in fields[:len(GROUP_FIELDS)])
+        updates = ', '.join(
+            f'{quote(field.column)} = {table}.{quote(field.column)} + EXCLUDED.{quote(field.column)}'
+            for field in fields[len(GROUP_FIELDS):]
+        )
+        sql = (
+            f'INSERT INTO {table} ({columns}) VALUES ({placeholders}) '
+            f'ON CONFLICT ({key}) DO UPDATE SET {updates}'
+        )
+        from api.native import column_converter
+        # Prepared a column at a time on the real connection, not the thread-local proxy
+        db = connections[DEFAULT_DB_ALIAS]
+        columns = [
+            column_converter(field, db)(values)
+            for field, values in zip(fields, zip(*rows))
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, list(zip(*columns)))
+
+        # Groups whose last row was moved out no longer exist
+        if any(totals[2] < 0 for totals in self.groups.values()):
+            TrackingDailyRollup.objects.filter(
+                date__in={key[0] for key in self.groups}, row_count__lte=0
+            ).delete()
@@ -0,0 +1,87 @@
+import csv
+import io
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import Count, Sum
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from influencers.models import Influencer
+from tracking.models import TrackingData, TrackingDailyRollup
+from tracking.rollup import GROUP_FIELDS
+
+EXAMPLE_DATA = settings.BASE_DIR.parent / 'example_data'
+
+
+class TrackingRollupTests(TestCase):
+    """The daily rollup matches the raw tracking rows however they change"""
+
+    def setUp(self):
+        self.client = APIClient()
+        for model_type, name in (('influencers', 'influencers.csv'), ('tracking', 'tracking.csv')):
+            self.upload(model_type, name, (EXAMPLE_DATA / name).read_bytes())
+
+    def upload(self, model_type, name, content, **data):
+        response = self.client.post('/api/upload/', {
+            'model_type': model_type,
+            'file': SimpleUploadedFile(name, content),
+            **data
+        })
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data
+
+    def assertRollupMatches(self):
+        raw = {
+            tuple(row[field] for field in GROUP_FIELDS): (row['orders'], row['revenue'], row['rows'])
+            for row in TrackingData.objects.order_by().values(*GROUP_FIELDS).annotate(
+                orders=Sum('orders'), revenue=Sum('revenue'), rows=Count('id')
+            )
+        }
+        rollup = {
+            tuple(row[:len(GROUP_FIELDS)]): tuple(row[len(GROUP_FIELDS):])
+            for row in TrackingDailyRollup.objects.values_list(*GROUP_FIELDS, 'orders', 'revenue', 'row_count')
+        }
+        self.assertEqual(rollup, raw)
+
+    def test_rollup_follows_tracking(self):
+        self.assertRollupMatches()
+
+        # Upsert a re-delivery with changed revenue and campaigns
+        rows = list(csv.DictReader(io.StringIO((EXAMPLE_DATA / 'tracking.csv').read_text())))
+        for row in rows[:10]:
+            row['revenue'] = '999.00'
+        for row in rows[10:15]:
+            row['campaign'] = 'Moved Campaign'
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=rows[0].keys())
+        writer.writeheader()
+        writer.writerows(rows)
+        result = self.upload('tracking', 'tracking.csv', out.getvalue().encode(), upsert='1')
+        self.assertEqual(result['updated_count'], 15)
+        self.assertRollupMatches()
+
+        # Edit one row, then several with a queryset update
+        row = TrackingData.objects.first()
+        row.orders += 3
+        row.date = date(2024, 6, 1)
+        row.save()
+        self.assertRollupMatches()
+        TrackingData.objects.filter(brand='Nike').update(revenue=Decimal('12.50'), source='Moved Source')
+        self.assertRollupMatches()
+
+        # Bulk delete
+        deleted, _ = TrackingData.objects.filter(campaign='Moved Campaign').delete()
+        self.assertEqual(deleted, 5)
+        self.assertRollupMatches()
+
+        # Cascade from deleting an influencer, and from a queryset of influencers
+        influencer = TrackingData.objects.first().influencer
+        influencer.delete()
+        self.assertFalse(TrackingData.objects.filter(influencer=influencer).exists())
+        self.assertRollupMatches()
+        Influencer.objects.filter(tracking_data__brand='Adidas').delete()
+        self.assertRollupMatches()
+        self.assertTrue(TrackingData.objects.exists())
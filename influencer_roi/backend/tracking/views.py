@@ -2,99 +2,100 @@ from rest_framework import viewsets, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Sum, Avg, Count
-from .models import TrackingData
+from django.db.models import Sum, Count
+from api.cache import cached_analytics
+from api.conditional import ConditionalGetMixin
+from api.filters import AnalyticsFiltersMixin
+from .models import TrackingData, TrackingDailyRollup
 from .serializers import TrackingDataSerializer, TrackingDataSummarySerializer
 
 
-class TrackingDataViewSet(viewsets.ModelViewSet):
+class TrackingDataViewSet(ConditionalGetMixin, AnalyticsFiltersMixin, viewsets.ModelViewSet):
     """ViewSet for TrackingData model"""
     queryset = TrackingData.objects.select_related('influencer').all()
     serializer_class = TrackingDataSerializer
+    data_tables = ('tracking', 'influencers', 'payouts')
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['source', 'campaign', 'brand', 'influencer', 'product', 'date', 'influencer__gender', 'influencer__platform', 'influencer__category']
     search_fields = ['campaign', 'brand', 'product', 'influencer__name']
     ordering_fields = ['date', 'orders', 'revenue', 'created_at']
-    ordering = ['-date']
+    ordering = ['-date', '-created_at']
+    
+    def rollup_queryset(self):
+        """
+        Daily rollup rows matching the analytics filters; every filter the
+        analytics actions accept is a rollup dimension
+        """
+        return self.analytics_filters().tracking(TrackingDailyRollup.objects.all())
+    
+    def grouped_totals(self, field):
+        """Revenue, orders and average order value per value of `field`, highest revenue first"""
+        groups = self.rollup_queryset().values(field).annotate(
+            total_revenue=Sum('revenue'),
+            total_orders=Sum('orders'),
+            total_rows=Sum('row_count')
+        ).order_by('-total_revenue')
+        
+        rows = []
+        for group in groups:
+            total_rows = group.pop('total_rows')
+            group['avg_order_value'] = group['total_revenue'] / total_rows if total_rows else 0
+            rows.append(group)
+        return rows
     
     @action(detail=False, methods=['get'])
+    @cached_analytics()
     def summary(self, request):
         """Get summary statistics for tracking data"""
-        queryset = self.get_queryset()
-        
-        # Apply date filters if provided
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        
-        if start_date and end_date:
-            queryset = queryset.filter(date__range=[start_date, end_date])
-        
-        # Apply influencer filters if provided
-        influencer_gender = request.query_params.get('influencer__gender')
-        influencer_platform = request.query_params.get('influencer__platform')
-        influencer_category = request.query_params.get('influencer__category')
-        brand = request.query_params.get('brand')
-        
-        if influencer_gender:
-            queryset = queryset.filter(influencer__gender=influencer_gender)
-        if influencer_platform:
-            queryset = queryset.filter(influencer__platform=influencer_platform)
-        if influencer_category:
-            queryset = queryset.filter(influencer__category=influencer_category)
-        if brand:
-            queryset = queryset.filter(brand=brand)
+        totals = self.rollup_queryset().aggregate(
+            total_revenue=Sum('revenue'),
+            total_orders=Sum('orders'),
+            total_rows=Sum('row_count'),
+            total_campaigns=Count('campaign', distinct=True),
+            total_brands=Count('brand', distinct=True),
+            total_influencers=Count('influencer', distinct=True)
+        )
+        total_revenue = totals['total_revenue'] or 0
         
         summary = {
-            'total_revenue': queryset.aggregate(total=Sum('revenue'))['total'] or 0,
-            'total_orders': queryset.aggregate(total=Sum('orders'))['total'] or 0,
-            'average_order_value': queryset.aggregate(avg=Avg('revenue'))['avg'] or 0,
-            'total_campaigns': queryset.values('campaign').distinct().count(),
-            'total_brands': queryset.values('brand').distinct().count(),
-            'total_influencers': queryset.values('influencer').distinct().count(),
-            'date_range': f"{start_date} to {end_date}" if start_date and end_date else "All time"
+            'total_revenue': total_revenue,
+            'total_orders': totals['total_orders'] or 0,
+            'average_order_value': total_revenue / totals['total_rows'] if totals['total_rows'] else 0,
+            'total_campaigns': totals['total_campaigns'],
+            'total_brands': totals['total_brands'],
+            'total_influencers': totals['total_influencers'],
+            'date_range': self.analytics_filters().date_range
         }
         
         serializer = TrackingDataSummarySerializer(summary)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cached_analytics()
     def by_campaign(self, request):
         """Get tracking data grouped by campaign"""
-        queryset = self.get_queryset()
-        
-        campaigns = queryset.values('campaign').annotate(
-            total_revenue=Sum('revenue'),
-            total_orders=Sum('orders'),
-            avg_order_value=Avg('revenue')
-        ).order_by('-total_revenue')
-        
-        return Response(campaigns)
+        return Response(self.grouped_totals('campaign'))
     
     @action(detail=False, methods=['get'])
+    @cached_analytics()
     def by_influencer(self, request):
         """Get tracking data grouped by influencer"""
-        queryset = self.get_queryset()
-        
-        influencers = queryset.values('influencer__name').annotate(
-            total_revenue=Sum('revenue'),
-            total_orders=Sum('orders'),
-            avg_order_value=Avg('revenue')
-        ).order_by('-total_revenue')
-        
-        return Response(influencers)
+        return Response(self.grouped_totals('influencer__name'))
     
     @action(detail=False, methods=['get'])
+    @cached_analytics()
     def roas_analysis(self, request):
         """Get ROAS analysis comparing revenue vs payouts"""
         from payouts.models import Payout
         
         # Get total revenue
-        total_revenue = self.get_queryset().aggregate(
+        total_revenue = self.rollup_queryset().aggregate(
             total=Sum('revenue')
         )['total'] or 0
         
-        # Get total payouts
-        total_payouts = Payout.objects.aggregate(
+        # Get total payouts for the same period and influencers
+        payouts = self.analytics_filters().payouts(Payout.objects.all())
+        total_payouts = payouts.aggregate(
             total=Sum('total_payout')
         )['total'] or 0
         
@@ -5,6 +5,8 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import json
+import time
+import gzip
 
 # Page configuration
 st.set_page_config(
@@ -62,11 +64,20 @@ def safe_convert(value, target_type=float, default=0):
         return default
 
 def fetch_data(endpoint, params=None):
-    """Fetch data from Django API"""
+    """Fetch data from Django API, revalidating bodies cached in the session by ETag"""
     try:
-        response = requests.get(f"{API_BASE_URL}/{endpoint}/", params=params)
+        cache = st.session_state.setdefault('api_responses', {})
+        key = (endpoint, tuple(sorted((params or {}).items())))
+        cached = cache.get(key)
+        headers = {'If-None-Match': cached[0]} if cached else {}
+        response = requests.get(f"{API_BASE_URL}/{endpoint}/", params=params, headers=headers)
+        if response.status_code == 304 and cached:
+            return cached[1]
         response.raise_for_status()
-        return response.json()
+        data = response.json()
+        if response.headers.get('ETag'):
+            cache[key] = (response.headers['ETag'], data)
+        return data
     except requests.exceptions.RequestException as e:
         st.error(f"Error fetching data: {e}")
         return None
@@ -111,6 +122,22 @@ def main():
     brands = ["All", "Nike", "Adidas", "Apple", "Samsung", "Coca-Cola", "Pepsi", "McDonald's", "KFC"]
     selected_brand = st.sidebar.selectbox("Brand", brands)
     
+    # Every analytics panel for these filters in one request
+    params = {
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'end_date': end_date.strftime('%Y-%m-%d')
+    }
+    if selected_platform != "All":
+        params['influencer__platform'] = selected_platform.lower()
+    if selected_category != "All":
+        params['influencer__category'] = selected_category
+    if selected_gender != "All":
+        params['influencer__gender'] = selected_gender.lower()
+    if selected_brand != "All":
+        params['brand'] = selected_brand
+    dashboard = fetch_data('dashboard', params) or {}
+    panels = dashboard.get('panels', {})
+    
     # Main content tabs
     tab1, tab2, tab3, tab4, tab5 = st.tabs([
         "📈 Campaign Performance", 
@@ -121,41 +148,25 @@ def main():
     ])
     
     with tab1:
-        show_campaign_performance(start_date, end_date, selected_platform, selected_category, selected_gender, selected_brand)
+        show_campaign_performance(panels)
     
     with tab2:
         show_influencer_comparison(start_date, end_date, selected_platform, selected_category, selected_gender, selected_brand)
     
     with tab3:
-        show_incremental_roas(start_date, end_date, selected_platform, selected_category, selected_gender, selected_brand)
+        show_incremental_roas(panels)
     
     with tab4:
-        show_payout_tracking(start_date, end_date, selected_platform, selected_category, selected_gender, selected_brand)
+        show_payout_tracking(panels)
     
     with tab5:
         show_insights_innovation(start_date, end_date, selected_platform, selected_category, selected_gender, selected_brand)
 
-def show_campaign_performance(start_date, end_date, platform, category, gender, brand):
+def show_campaign_performance(panels):
     """Campaign Performance Dashboard"""
     st.markdown("## 📈 Campaign Performance")
     
-    # Fetch summary data
-    params = {
-        'start_date': start_date.strftime('%Y-%m-%d'),
-        'end_date': end_date.strftime('%Y-%m-%d')
-    }
-    
-    # Add filters if not "All"
-    if platform != "All":
-        params['influencer__platform'] = platform.lower()
-    if category != "All":
-        params['influencer__category'] = category
-    if gender != "All":
-        params['influencer__gender'] = gender.lower()
-    if brand != "All":
-        params['influencer__brand'] = brand.lower()
-    
-    tracking_summary = fetch_data('tracking/summary', params)
+    tracking_summary = panels.get('tracking_summary')
     
     if tracking_summary:
         # KPI metrics
@@ -197,7 +208,7 @@ def show_campaign_performance(start_date, end_date, platform, category, gender,
         
         with col1:
             st.markdown("### Revenue by Campaign")
-            campaign_data = fetch_data('tracking/by_campaign', params)
+            campaign_data = panels.get('tracking_by_campaign')
             if campaign_data and len(campaign_data) > 0:
                 df = pd.DataFrame(campaign_data)
                 if not df.empty and 'campaign' in df.columns and 'total_revenue' in df.columns:
@@ -217,7 +228,7 @@ def show_campaign_performance(start_date, end_date, platform, category, gender,
         
         with col2:
             st.markdown("### Revenue by Influencer")
-            influencer_data = fetch_data('tracking/by_influencer', params)
+            influencer_data = panels.get('tracking_by_influencer')
             if influencer_data and len(influencer_data) > 0:
                 df = pd.DataFrame(influencer_data)
                 if not df.empty and 'influencer__name' in df.columns and 'total_revenue' in df.columns:
@@ -323,27 +334,12 @@ def show_influencer_comparison(start_date, end_date, platform, category, gender,
         else:
             st.info("No platform data available yet.")
 
-def show_incremental_roas(start_date, end_date, platform, category, gender, brand):
+def show_incremental_roas(panels):
     """Incremental ROAS Analysis"""
     st.markdown("## 💰 Incremental ROAS Analysis")
     
-    params = {
-        'start_date': start_date.strftime('%Y-%m-%d'),
-        'end_date': end_date.strftime('%Y-%m-%d')
-    }
-    
-    # Add filters if not "All"
-    if platform != "All":
-        params['influencer__platform'] = platform.lower()
-    if category != "All":
-        params['influencer__category'] = category
-    if gender != "All":
-        params['influencer__gender'] = gender.lower()
-    if brand != "All":
-        params['influencer__brand'] = brand.lower()
-    
     # ROAS analysis
-    roas_data = fetch_data('tracking/roas_analysis', params)
+    roas_data = panels.get('tracking_roas_analysis')
     
     if roas_data:
         col1, col2, col3 = st.columns(3)
@@ -379,7 +375,7 @@ def show_incremental_roas(start_date, end_date, platform, category, gender, bran
         
         # ROAS by influencer
         st.markdown("### ROAS by Influencer")
-        payout_data = fetch_data('payouts/by_influencer', params)
+        payout_data = panels.get('payouts_by_influencer')
         if payout_data and len(payout_data) > 0:
             df = pd.DataFrame(payout_data)
             if not df.empty and 'avg_roas' in df.columns:
@@ -397,27 +393,12 @@ def show_incremental_roas(start_date, end_date, platform, category, gender, bran
         else:
             st.info("No payout data available yet. Upload some data to see analytics!")
 
-def show_payout_tracking(start_date, end_date, platform, category, gender, brand):
+def show_payout_tracking(panels):
     """Payout Tracking Dashboard"""
     st.markdown("## 💸 Payout Tracking")
     
-    params = {
-        'start_date': start_date.strftime('%Y-%m-%d'),
-        'end_date': end_date.strftime('%Y-%m-%d')
-    }
-    
-    # Add filters if not "All"
-    if platform != "All":
-        params['influencer__platform'] = platform.lower()
-    if category != "All":
-        params['influencer__category'] = category
-    if gender != "All":
-        params['influencer__gender'] = gender.lower()
-    if brand != "All":
-        params['influencer__brand'] = brand.lower()
-    
-    payout_summary = fetch_data('payouts/summary', params)
-    efficiency_metrics = fetch_data('payouts/efficiency_metrics', params)
+    payout_summary = panels.get('payouts_summary')
+    efficiency_metrics = panels.get('payouts_efficiency_metrics')
     
     if payout_summary and efficiency_metrics:
         # KPI metrics
@@ -499,7 +480,7 @@ def show_payout_tracking(start_date, end_date, platform, category, gender, brand
         
         with col1:
             st.markdown("### Payouts by Basis Type")
-            basis_data = fetch_data('payouts/by_basis', params)
+            basis_data = panels.get('payouts_by_basis')
             if basis_data and len(basis_data) > 0:
                 df = pd.DataFrame(basis_data)
                 if not df.empty and 'total_payout' in df.columns:
@@ -517,7 +498,7 @@ def show_payout_tracking(start_date, end_date, platform, category, gender, brand
         
         with col2:
             st.markdown("### Top Performers by Payout")
-            top_performers = fetch_data('payouts/top_performers', params)
+            top_performers = panels.get('payouts_top_performers')
             if top_performers and len(top_performers) > 0:
                 df = pd.DataFrame(top_performers)
                 if not df.empty and 'total_payout' in df.columns:
@@ -537,7 +518,7 @@ def show_payout_tracking(start_date, end_date, platform, category, gender, brand
         
         # Charts Section 2 - Platform Analysis
         st.markdown("### 📱 Payout Analysis by Platform")
-        platform_data = fetch_data('payouts/by_platform', params)
+        platform_data = panels.get('payouts_by_platform')
         if platform_data and len(platform_data) > 0:
             df = pd.DataFrame(platform_data)
             if not df.empty and 'total_payout' in df.columns:
@@ -571,7 +552,7 @@ def show_payout_tracking(start_date, end_date, platform, category, gender, brand
         
         # Charts Section 3 - Category Analysis
         st.markdown("### 🏷️ Payout Analysis by Category")
-        category_data = fetch_data('payouts/by_category', params)
+        category_data = panels.get('payouts_by_category')
         if category_data and len(category_data) > 0:
             df = pd.DataFrame(category_data)
             if not df.empty and 'total_payout' in df.columns:
@@ -605,7 +586,7 @@ def show_payout_tracking(start_date, end_date, platform, category, gender, brand
         
         # Charts Section 4 - ROAS Analysis
         st.markdown("### 💰 ROAS Performance Analysis")
-        payout_data = fetch_data('payouts/by_influencer', params)
+        payout_data = panels.get('payouts_by_influencer')
         if payout_data and len(payout_data) > 0:
             df = pd.DataFrame(payout_data)
             if not df.empty and 'avg_roas' in df.columns:
@@ -677,6 +658,96 @@ def show_payout_tracking(start_date, end_date, platform, category, gender, brand
     else:
         st.info("No payout data available yet. Upload some data to see analytics!")
 
+def compress_upload(uploaded_file):
+    """Return the (name, content) to send, gzipping plain CSV/JSON uploads to cut transfer size"""
+    name = uploaded_file.name
+    if not name.lower().endswith(('.csv', '.json', '.ndjson', '.jsonl')):
+        return (name, uploaded_file.getvalue())
+    # A fixed header mtime keeps the bytes of a re-sent file identical for upload dedup
+    return (f"{name}.gz", gzip.compress(uploaded_file.getvalue(), compresslevel=6, mtime=0))
+
+def upload_in_chunks(name, content, data, retries=3):
+    """Send a file through a resumable upload session and return the finalize response"""
+    progress = st.progress(0.0, text="Uploading...")
+    
+    # Resume the session left behind by an interrupted upload of the same file
+    key = f"upload_session:{name}:{len(content)}"
+    session = None
+    if key in st.session_state:
+        response = requests.get(f"{API_BASE_URL}/upload/sessions/{st.session_state[key]}/")
+        if response.status_code == 200:
+            session = response.json()
+    
+    if session is None:
+        response = requests.post(
+            f"{API_BASE_URL}/upload/sessions/",
+            data={**data, 'file_name': name, 'total_size': len(content)}
+        )
+        if response.status_code != 201:
+            return response
+        session = response.json()
+        st.session_state[key] = session['id']
+    
+    chunk_size = session['chunk_size']
+    total_chunks = session['total_chunks']
+    sent = total_chunks - len(session['missing_chunks'])
+    for index in session['missing_chunks']:
+        for attempt in range(retries):
+            try:
+                response = requests.put(
+                    f"{API_BASE_URL}/upload/sessions/{session['id']}/chunks/{index}/",
+                    data=content[index * chunk_size:(index + 1) * chunk_size],
+                    headers={'Content-Type': 'application/octet-stream'}
+                )
+            except requests.exceptions.RequestException:
+                if attempt == retries - 1:
+                    raise
+                continue
+            if response.status_code == 200:
+                break
+        else:
+            return response
+        
+        sent += 1
+        progress.progress(sent / total_chunks, text=f"Uploaded {sent} of {total_chunks} chunks")
+    
+    del st.session_state[key]
+    return requests.post(f"{API_BASE_URL}/upload/sessions/{session['id']}/finalize/")
+
+def show_validation_report(report):
+    """Show the outcome of a dry-run upload"""
+    if report['invalid_count']:
+        st.warning(report['message'])
+    else:
+        st.success(report['message'])
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total Records", report.get('total_records', 0))
+    with col2:
+        st.metric("Valid", report.get('valid_count', 0))
+    with col3:
+        st.metric("Invalid", report.get('invalid_count', 0))
+    
+    if report.get('errors'):
+        st.dataframe(pd.DataFrame({'error': report['errors']}), use_container_width=True)
+
+def wait_for_upload_job(job_id, poll_interval=0.5):
+    """Poll an upload job, showing its progress, and return the final status"""
+    progress = st.progress(0.0, text="Importing...")
+    while True:
+        job = fetch_data(f"upload/jobs/{job_id}")
+        if job is None:
+            return {'status': 'failed', 'error': 'Lost track of upload job'}
+        
+        progress.progress(
+            min(safe_convert(job.get('progress'), float, 0), 1.0),
+            text=f"Imported {job['rows_processed']:,} rows ({job['rows_per_second']:,.0f} rows/sec)"
+        )
+        if job['status'] in ('completed', 'failed'):
+            return job
+        time.sleep(poll_interval)
+
 def show_insights_innovation(start_date, end_date, platform, category, gender, brand):
     """Insights and Innovation Dashboard"""
     st.markdown("## 💡 Insights & Innovation")
@@ -740,31 +811,63 @@ def show_insights_innovation(start_date, end_date, platform, category, gender, b
         st.info("💡 **Tip**: Clear database first to test uploads")
     
     uploaded_file = st.file_uploader(
-        "Upload CSV/JSON data", 
-        type=['csv', 'json'],
-        help="Upload influencer, post, tracking, or payout data"
+        "Upload CSV/JSON/Parquet/Arrow data", 
+        type=['csv', 'json', 'ndjson', 'jsonl', 'parquet', 'arrow', 'feather', 'gz', 'bz2', 'zst', 'zip'],
+        help="Upload influencer, post, tracking, or payout data, or a zip archive of all of them"
     )
     
     if uploaded_file is not None:
-        model_type = st.selectbox(
-            "Select data type",
-            ["influencers", "posts", "tracking", "payouts"]
-        )
+        # Archives name their entity files themselves
+        if uploaded_file.name.lower().endswith('.zip'):
+            model_type = 'archive'
+            st.caption("Zip archive: influencers are loaded first, then posts, tracking and payouts")
+        else:
+            model_type = st.selectbox(
+                "Select data type",
+                ["influencers", "posts", "tracking", "payouts"]
+            )
+        
+        dry_run = st.checkbox("Validate only (dry run)", help="Check every row without writing anything")
         
-        if st.button("Upload Data"):
+        if st.button("Validate Data" if dry_run else "Upload Data"):
             try:
-                files = {'file': uploaded_file}
+                upload = compress_upload(uploaded_file)
                 data = {'model_type': model_type}
                 
-                response = requests.post(
-                    f"{API_BASE_URL}/upload/",
-                    files=files,
-                    data=data
-                )
+                # Dry runs answer directly; imports go up in resumable chunks
+                if dry_run:
+                    response = requests.post(
+                        f"{API_BASE_URL}/upload/",
+                        files={'file': upload},
+                        data={**data, 'dry_run': 1}
+                    )
+                else:
+                    name, content = upload
+                    response = upload_in_chunks(name, content, data)
                 
-                if response.status_code == 201:
+                # Poll the background import job until it finishes
+                result = None
+                report = None
+                if dry_run and response.status_code == 200:
+                    report = response.json()
+                elif response.status_code == 202:
+                    job = wait_for_upload_job(response.json()['job_id'])
+                    if job['status'] == 'completed':
+                        result = job['result']
+                    else:
+                        error = job.get('error')
+                elif response.status_code in (200, 201):
+                    # 200 means the same file was already imported
                     result = response.json()
+                else:
+                    error = response.text
+                
+                if report is not None:
+                    show_validation_report(report)
+                elif result is not None:
                     st.success(result['message'])
+                    if result.get('duplicate'):
+                        st.info(f"This file was already imported as {result['duplicate_of']['file_name']} - showing that import's result")
                     
                     # Show detailed statistics
                     col1, col2, col3 = st.columns(3)
@@ -778,7 +881,7 @@ def show_insights_innovation(start_date, end_date, platform, category, gender, b
                     if result.get('errors'):
                         st.warning(f"Some errors occurred: {result['errors']}")
                 else:
-                    st.error(f"Upload failed: {response.text}")
+                    st.error(f"Upload failed: {error}")
                     
             except Exception as e:
                 st.error(f"Upload error: {str(e)}")